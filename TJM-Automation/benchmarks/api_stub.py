@@ -0,0 +1,92 @@
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+def make_posts(count: int, body_size: int = 200, title_size: int = 40) -> List[Dict]:
+    filler = 'lorem ipsum dolor sit amet '
+    body = (filler * (body_size // len(filler) + 1))[:body_size]
+    title = (filler * (title_size // len(filler) + 1))[:title_size]
+    return [
+        {'userId': (i - 1) // 10 + 1, 'id': i, 'title': f"{title} {i}", 'body': body}
+        for i in range(1, count + 1)
+    ]
+
+
+class ApiStub:
+    # Local stand-in for the posts API. Serves /posts (optionally paged with
+    # ?_page=&_limit=), /posts/<id>, and answers If-None-Match with 304.
+    def __init__(self, posts: List[Dict], host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.posts = posts
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                status, payload = stub._resolve(self.path)
+                data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    status, data = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                if status in (200, 304):
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _resolve(self, path: str):
+        parsed = urlparse(path)
+        parts = [p for p in parsed.path.split('/') if p]
+        if len(parts) == 2 and parts[0] == 'posts':
+            try:
+                index = int(parts[1])
+            except ValueError:
+                return 404, None
+            if 1 <= index <= len(self.posts):
+                return 200, self.posts[index - 1]
+            return 404, None
+        if parts != ['posts']:
+            return 404, None
+        query = parse_qs(parsed.query)
+        if '_page' in query and '_limit' in query:
+            page, limit = int(query['_page'][0]), int(query['_limit'][0])
+            return 200, self.posts[(page - 1) * limit:page * limit]
+        return 200, self.posts
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/posts"
+
+    def start(self) -> 'ApiStub':
+        self._thread = threading.Thread(target=self.server.serve_forever, name='api-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'ApiStub':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,301 @@
+"""
+End-to-end pipeline benchmark.
+
+Serves synthetic posts from a local API stub and drives
+fetch -> format -> sanitize -> resolve -> write -> verify into a temp
+directory, reporting posts/sec and per-stage p50/p95/p99 latencies as the
+best of --repeat runs.
+
+Usage (from the TJM-Automation directory):
+    python -m benchmarks.bench_pipeline --posts 2000 --output bench.json
+    python -m benchmarks.bench_pipeline --posts 2000 --baseline bench.json
+
+Exits with status 1 when a result regresses past --tolerance versus the
+baseline file.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.api_stub import ApiStub, make_posts  # noqa: E402
+
+# The regression gate compares posts/sec and per-stage medians (p50); tail
+# percentiles swing with scheduling noise and are reported only. Stage
+# differences below NOISE_FLOOR seconds are ignored, as are stages with fewer
+# than MIN_SAMPLES timings (one-off spans such as fetch or shard start-up).
+NOISE_FLOOR = 250e-6
+MIN_SAMPLES = 20
+# Settings that change what is measured; a baseline taken with different
+# ones is not comparable.
+COMPARABLE_CONFIG = ('posts', 'body_size', 'title_size', 'latency', 'workers', 'gui', 'shards', 'sink',
+                     'pipeline_depth')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def time(self, stage: str, func: Callable, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+            }
+            for stage, values in self.samples.items()
+        }
+
+
+def _robust_kwargs(url: str, out_dir: Path, log_file: Path, workers: int, gui_backend=None,
+                   sink: str = 'files', pipeline_depth: int = 0) -> Dict:
+    return dict(
+        api_url=url,
+        api_timeout=30,
+        output_dir=out_dir,
+        conflict_action='rename',
+        typing_interval=0.0,
+        waits={'window': 5, 'save_dialog': 1, 'file': 5},
+        log_file=str(log_file),
+        log_level='WARNING',
+        write_workers=workers,
+        gui_backend=gui_backend,
+        use_gui=gui_backend is not None,
+        output_sink=sink,
+        pipeline_depth=pipeline_depth,
+    )
+
+
+def _make_robust(url: str, out_dir: Path, log_file: Path, workers: int, gui_backend=None,
+                 sink: str = 'files', pipeline_depth: int = 0):
+    from robust import RobustNotepadBot
+    return RobustNotepadBot(**_robust_kwargs(url, out_dir, log_file, workers, gui_backend, sink, pipeline_depth))
+
+
+def bench_robust_stages(url: str, count: int, workdir: Path, args) -> Dict:
+    bot = _make_robust(url, workdir / 'robust-stages', workdir / 'bench.log', 1)
+    timer = StageTimer()
+    try:
+        bot.files.ensure_output_dir()
+        start = time.perf_counter()
+        posts = timer.time('fetch', bot.api.fetch_posts, count)
+        for idx, post in enumerate(posts, 1):
+            post_start = time.perf_counter()
+            data = timer.time('format', bot._render_post, post)
+            name = timer.time('sanitize', bot.files.sanitize_filename, f"post {post.get('id', idx)}", 'txt')
+            target = timer.time('resolve', bot.files.resolve_conflict, bot.files.output_dir / name)
+            if target is None:
+                continue
+            timer.time('write', bot.files.write_bytes, target, data)
+            timer.time('verify', bot._verify_file_integrity, target, data)
+            timer.samples.setdefault('post', []).append(time.perf_counter() - post_start)
+        elapsed = time.perf_counter() - start
+    finally:
+        bot.close()
+    return {'posts': len(posts), 'seconds': elapsed, 'posts_per_sec': _rate(len(posts), elapsed),
+            'stages': timer.report()}
+
+
+def bench_robust_run(url: str, count: int, workdir: Path, args) -> Dict:
+    gui_backend = None
+    if args.gui == 'fake':
+        from robust import FakeNotepadBackend
+        gui_backend = FakeNotepadBackend()
+    if args.shards > 1:
+        from robust import ShardCoordinator
+        bot = ShardCoordinator(_robust_kwargs(url, workdir / 'robust-run', workdir / 'bench.log',
+                                              args.workers, sink=args.sink), args.shards)
+    else:
+        bot = _make_robust(url, workdir / 'robust-run', workdir / 'bench.log', args.workers, gui_backend,
+                           args.sink, args.pipeline_depth)
+    try:
+        start = time.perf_counter()
+        stats = bot.run(limit=count, prefix='post', extension='txt')
+        elapsed = time.perf_counter() - start
+    finally:
+        bot.close()
+    done = stats['successful_posts'] + stats['failed_posts']
+    return {'posts': done, 'failed': stats['failed_posts'], 'seconds': elapsed,
+            'posts_per_sec': _rate(done, elapsed), 'stages': stats.stage_summary()}
+
+
+def bench_legacy(url: str, count: int, workdir: Path, args) -> Optional[Dict]:
+    # The legacy bot only saves through the GUI, so its write stage is timed
+    # with a plain text write of the formatted content.
+    try:
+        import bot as legacy
+    except Exception as exc:
+        print(f"Skipping legacy benchmark: cannot import bot.py ({exc})")
+        return None
+    instance = legacy.NotepadAutomationBot()
+    instance.api_url = url
+    instance.output_dir = workdir / 'legacy'
+    instance.file_conflict_action = 'rename'
+    instance.setup_output_directory()
+    timer = StageTimer()
+    start = time.perf_counter()
+    posts = timer.time('fetch', instance.fetch_posts_from_api, count)
+    for post in posts:
+        post_start = time.perf_counter()
+        content = timer.time('format', instance.format_post_content, post)
+        filename = f"{instance.file_prefix} {post.get('id', 'unknown')}.{instance.file_extension}"
+        target = timer.time('resolve', instance.resolve_file_conflict, instance.output_dir / filename)
+        if target is None:
+            continue
+        timer.time('write', target.write_text, content, encoding='utf-8')
+        timer.samples.setdefault('post', []).append(time.perf_counter() - post_start)
+    elapsed = time.perf_counter() - start
+    return {'posts': len(posts), 'seconds': elapsed, 'posts_per_sec': _rate(len(posts), elapsed),
+            'stages': timer.report()}
+
+
+BENCHMARKS = {
+    'robust-stages': bench_robust_stages,
+    'robust-run': bench_robust_run,
+    'legacy': bench_legacy,
+}
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def best_result(runs: List[Dict]) -> Dict:
+    # Repeated runs are combined as timeit does: noise from other processes
+    # only ever adds time, so the fastest run and the lowest value of each
+    # stage percentile are the most reproducible figures to gate on.
+    result = dict(max(runs, key=lambda run: run['posts_per_sec']))
+    stages = {}
+    for stage, stats in result.get('stages', {}).items():
+        samples = [run['stages'][stage] for run in runs if stage in run.get('stages', {})]
+        stages[stage] = {'count': stats['count']}
+        stages[stage].update({key: min(s[key] for s in samples) for key in ('p50', 'p95', 'p99')})
+    result['stages'] = stages
+    result['repeats'] = len(runs)
+    return result
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions: List[str] = []
+    config, base_config = current.get('config', {}), baseline.get('config', {})
+    differing = [key for key in COMPARABLE_CONFIG if key in base_config and base_config[key] != config.get(key)]
+    if differing:
+        return [f"baseline not comparable: {key} {base_config[key]!r} != {config.get(key)!r}" for key in differing]
+    for name, result in current.get('results', {}).items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        if result['posts_per_sec'] < base['posts_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: posts/sec {result['posts_per_sec']:.1f} < baseline {base['posts_per_sec']:.1f}"
+            )
+        for stage, stats in result.get('stages', {}).items():
+            base_stage = base.get('stages', {}).get(stage)
+            if not base_stage or min(stats['count'], base_stage.get('count', 0)) < MIN_SAMPLES:
+                continue
+            now, then = stats['p50'], base_stage['p50']
+            if now > then * (1 + tolerance) and now - then > NOISE_FLOOR:
+                regressions.append(f"{name}/{stage}: p50 {now * 1e3:.3f}ms > baseline {then * 1e3:.3f}ms")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    for name, result in report['results'].items():
+        print(f"\n{name}: {result['posts']} posts in {result['seconds']:.3f}s "
+              f"({result['posts_per_sec']:.1f} posts/sec)")
+        for stage, stats in result.get('stages', {}).items():
+            print(f"  {stage:<9} n={stats['count']:<6} p50={stats['p50'] * 1e3:8.3f}ms "
+                  f"p95={stats['p95'] * 1e3:8.3f}ms p99={stats['p99'] * 1e3:8.3f}ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000, help='number of synthetic posts to serve')
+    parser.add_argument('--body-size', type=int, default=200, help='characters per post body')
+    parser.add_argument('--title-size', type=int, default=40, help='characters per post title')
+    parser.add_argument('--latency', type=float, default=0.0, help='artificial API latency in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='write workers for robust-run')
+    parser.add_argument('--gui', choices=['none', 'fake'], default='none',
+                        help="drive robust-run through the fake GUI backend")
+    parser.add_argument('--shards', type=int, default=1,
+                        help='run robust-run as a sharded multi-process run (direct writes only)')
+    parser.add_argument('--sink', choices=['files', 'zip', 'tar', 'pack'], default='files',
+                        help='output sink for robust-run')
+    parser.add_argument('--pipeline-depth', type=int, default=0,
+                        help='queue bound of the overlapped fetch/render/write/verify pipeline (0 = off)')
+    parser.add_argument('--only', default=','.join(BENCHMARKS), help='comma-separated benchmarks to run')
+    parser.add_argument('--output', type=Path, help='write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, help='compare against a previous JSON result')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per benchmark; the best of them is reported')
+    args = parser.parse_args(argv)
+
+    report = {
+        'config': {
+            'posts': args.posts, 'body_size': args.body_size, 'title_size': args.title_size,
+            'latency': args.latency, 'workers': args.workers, 'gui': args.gui,
+            'shards': args.shards, 'sink': args.sink, 'pipeline_depth': args.pipeline_depth,
+            'repeat': args.repeat,
+            'python': platform.python_version(), 'platform': platform.platform(),
+        },
+        'results': {},
+    }
+    posts = make_posts(args.posts, args.body_size, args.title_size)
+    with ApiStub(posts, latency=args.latency) as stub, tempfile.TemporaryDirectory(prefix='tjm-bench-') as tmp:
+        for name in [n.strip() for n in args.only.split(',') if n.strip()]:
+            bench = BENCHMARKS.get(name)
+            if bench is None:
+                parser.error(f"unknown benchmark {name!r}")
+            runs = []
+            for run in range(max(1, args.repeat)):
+                workdir = Path(tmp) / f"{name}-{run}"
+                workdir.mkdir()
+                result = bench(stub.url, args.posts, workdir, args)
+                if result is None:
+                    break
+                runs.append(result)
+            if runs:
+                report['results'][name] = best_result(runs)
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('\nREGRESSIONS:')
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
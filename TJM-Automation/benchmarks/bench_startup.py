@@ -0,0 +1,164 @@
+"""
+Startup-time benchmark.
+
+Launches each entry point in a fresh process until it has finished its
+imports and configuration (bot.py --startup-probe) and reports min/median/
+p95 wall time. For source entry points it also lists the slowest imports
+(python -X importtime) and whether the GUI stack was loaded.
+
+Entry points:
+    source         python bot.py --startup-probe
+    robust-import  python -c "import robust"
+    frozen         the PyInstaller build (dist/TJM_Automation_Bot[.exe] or
+                   --frozen PATH) with --startup-probe; skipped if absent
+
+Usage (from the TJM-Automation directory):
+    python -m benchmarks.bench_startup --repeat 20 --output startup.json
+    python -m benchmarks.bench_startup --baseline startup.json
+
+Exits with status 1 when a median regresses past --tolerance versus the
+baseline file.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+GUI_MODULES = ('pyautogui', 'pygetwindow', 'pyperclip', 'pymsgbox', 'pytweening', 'pyscreeze', 'Xlib')
+# Differences below this many seconds are treated as scheduler noise.
+NOISE_FLOOR = 0.005
+
+
+def _entry_points(frozen: Optional[Path]) -> Dict[str, Optional[List[str]]]:
+    if frozen is None:
+        name = 'TJM_Automation_Bot.exe' if os.name == 'nt' else 'TJM_Automation_Bot'
+        frozen = ROOT / 'dist' / name
+    return {
+        'source': [sys.executable, 'bot.py', '--startup-probe'],
+        'robust-import': [sys.executable, '-c', 'import robust'],
+        'frozen': [str(frozen), '--startup-probe'] if frozen.exists() else None,
+    }
+
+
+def _time_once(cmd: List[str], env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def _import_profile(cmd: List[str], env: Dict[str, str], top: int) -> Dict:
+    # -X importtime writes "import time: self | cumulative | name" to stderr.
+    result = subprocess.run([cmd[0], '-X', 'importtime'] + cmd[1:], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.replace('import time:', '|').split('|')]
+        modules.append((name, int(self_us), int(cumulative_us)))
+    roots = [m for m in modules if not m[0].startswith(' ') and '.' not in m[0]]
+    slowest = sorted(roots, key=lambda m: m[2], reverse=True)[:top]
+    loaded = {m[0].strip() for m in modules}
+    return {
+        'modules_imported': len(modules),
+        'slowest': [{'module': name, 'cumulative_ms': cumulative / 1000} for name, _, cumulative in slowest],
+        'gui_modules_loaded': sorted(m for m in GUI_MODULES if m in loaded),
+    }
+
+
+def bench_entry(cmd: List[str], repeat: int, env: Dict[str, str], profile: bool, top: int) -> Dict:
+    _time_once(cmd, env)  # warm the OS file cache
+    samples = sorted(_time_once(cmd, env) for _ in range(repeat))
+    result = {
+        'runs': repeat,
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+    }
+    if profile:
+        result['imports'] = _import_profile(cmd, env, top)
+    return result
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions: List[str] = []
+    for name, result in current.get('results', {}).items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        now, then = result['median'], base['median']
+        if now > then * (1 + tolerance) and now - then > NOISE_FLOOR:
+            regressions.append(f"{name}: median {now * 1e3:.1f}ms > baseline {then * 1e3:.1f}ms")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    for name, result in report['results'].items():
+        print(f"\n{name}: min={result['min'] * 1e3:.1f}ms median={result['median'] * 1e3:.1f}ms "
+              f"p95={result['p95'] * 1e3:.1f}ms (n={result['runs']})")
+        imports = result.get('imports')
+        if imports:
+            gui = ', '.join(imports['gui_modules_loaded']) or 'none'
+            print(f"  {imports['modules_imported']} modules imported; GUI modules loaded: {gui}")
+            for item in imports['slowest']:
+                print(f"  {item['module']:<24} {item['cumulative_ms']:8.1f}ms")
+    for name in report['skipped']:
+        print(f"\n{name}: skipped (not built)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10, help='timed launches per entry point')
+    parser.add_argument('--top', type=int, default=8, help='slowest top-level imports to list')
+    parser.add_argument('--frozen', type=Path, help='path to the PyInstaller executable')
+    parser.add_argument('--only', default='source,robust-import,frozen', help='comma-separated entry points')
+    parser.add_argument('--output', type=Path, help='write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, help='compare against a previous JSON result')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args(argv)
+
+    entries = _entry_points(args.frozen)
+    report = {
+        'config': {'repeat': args.repeat, 'python': platform.python_version(), 'platform': platform.platform()},
+        'results': {},
+        'skipped': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='tjm-startup-') as tmp:
+        # Keep bot.py's logging out of the repo's log file and the console.
+        env = dict(os.environ, LOG_FILE=str(Path(tmp) / 'startup.log'), ENABLE_CONSOLE_LOGGING='false')
+        for name in [n.strip() for n in args.only.split(',') if n.strip()]:
+            if name not in entries:
+                parser.error(f"unknown entry point {name!r}")
+            cmd = entries[name]
+            if cmd is None:
+                report['skipped'].append(name)
+                continue
+            report['results'][name] = bench_entry(cmd, args.repeat, env, profile=name != 'frozen', top=args.top)
+
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('\nREGRESSIONS:')
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,16 +12,15 @@ Requirements:
 Version: 1.0.0
 """
 
-import pyautogui
-import pygetwindow as gw
-import requests
 import os
 import time
 import logging
+import importlib
 from pathlib import Path
 from typing import List, Dict, Optional
 import subprocess
 import sys
+import multiprocessing
 from dotenv import load_dotenv
 
 # Prefer robust implementation if available
@@ -33,24 +32,63 @@ except Exception:
 # Load environment variables
 load_dotenv('config.env')
 
-# Configure logging
-log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
-log_file = os.getenv('LOG_FILE', 'tjm_automation.log')
-enable_console = os.getenv('ENABLE_CONSOLE_LOGGING', 'true').lower() == 'true'
-
-logging.basicConfig(
-    level=getattr(logging, log_level),
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler(sys.stdout) if enable_console else logging.NullHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
-# Configure pyautogui
-pyautogui.FAILSAFE = os.getenv('ENABLE_FAILSAFE', 'true').lower() == 'true'
-pyautogui.PAUSE = float(os.getenv('PYAUTOGUI_PAUSE', '0.5'))
+
+def configure_logging():
+    """
+    Configure root logging for the main process.
+
+    Not done at import time: spawned shard workers re-import this module and
+    must log only to their own shard files.
+    """
+    log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    log_file = os.getenv('LOG_FILE', 'tjm_automation.log')
+    enable_console = os.getenv('ENABLE_CONSOLE_LOGGING', 'true').lower() == 'true'
+
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stdout) if enable_console else logging.NullHandler()
+        ]
+    )
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    
+    Keeps pyautogui, pygetwindow and requests (and the display libraries
+    they load) out of startup for runs that never use the legacy bot.
+    """
+    
+    def __init__(self, name: str, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+    
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._on_load is not None:
+                self._on_load(module)
+            self._module = module
+        return getattr(self._module, attr)
+
+
+def configure_pyautogui(module) -> None:
+    """
+    Apply the failsafe and pause settings once pyautogui is first used.
+    """
+    module.FAILSAFE = os.getenv('ENABLE_FAILSAFE', 'true').lower() == 'true'
+    module.PAUSE = float(os.getenv('PYAUTOGUI_PAUSE', '0.5'))
+
+
+pyautogui = LazyModule('pyautogui', configure_pyautogui)
+gw = LazyModule('pygetwindow')
+requests = LazyModule('requests')
 
 
 class NotepadAutomationBot:
@@ -85,12 +123,36 @@ class NotepadAutomationBot:
         self.dry_run = os.getenv('DRY_RUN', 'false').lower() == 'true'
         
         self.notepad_window = None
+        self._existing_names = None
         
         if self.debug_mode:
             logger.info(f"Bot initialized - API: {self.api_url}, Posts: {self.num_posts}")
             logger.info(f"Output directory: {self.output_dir}")
             logger.info(f"File conflict action: {self.file_conflict_action}")
     
+    def _name_taken(self, filepath: Path) -> bool:
+        """
+        Check whether a file name is already used in the output directory.
+        
+        The directory is listed once with os.scandir and kept in memory, so
+        renaming does not stat every candidate on disk.
+        
+        Args:
+            filepath (Path): Candidate file path
+            
+        Returns:
+            bool: True if the name is taken
+        """
+        if filepath.parent != self.output_dir:
+            return filepath.exists()
+        if self._existing_names is None:
+            try:
+                with os.scandir(self.output_dir) as entries:
+                    self._existing_names = {os.path.normcase(entry.name) for entry in entries}
+            except OSError:
+                self._existing_names = set()
+        return os.path.normcase(filepath.name) in self._existing_names
+    
     def resolve_file_conflict(self, filepath: Path) -> Path:
         """
         Resolve file conflicts based on configuration.
@@ -101,7 +163,16 @@ class NotepadAutomationBot:
         Returns:
             Path: Resolved file path
         """
-        if not filepath.exists():
+        resolved = self._resolve_file_conflict(filepath)
+        if resolved is not None and self._existing_names is not None and resolved.parent == self.output_dir:
+            self._existing_names.add(os.path.normcase(resolved.name))
+        return resolved
+    
+    def _resolve_file_conflict(self, filepath: Path) -> Path:
+        """
+        Pick the target path for filepath according to the conflict action.
+        """
+        if not self._name_taken(filepath):
             return filepath
         
         if self.file_conflict_action == 'skip':
@@ -117,7 +188,7 @@ class NotepadAutomationBot:
             while True:
                 new_name = f"{filepath.stem} ({counter}){filepath.suffix}"
                 new_path = filepath.parent / new_name
-                if not new_path.exists():
+                if not self._name_taken(new_path):
                     logger.info(f"File {filepath.name} already exists, renaming to {new_name}")
                     return new_path
                 counter += 1
@@ -136,6 +207,7 @@ class NotepadAutomationBot:
         """
         try:
             self.output_dir.mkdir(parents=True, exist_ok=True)
+            self._existing_names = None
             logger.info(f"Output directory ready: {self.output_dir}")
             return True
         except Exception as e:
@@ -319,17 +391,15 @@ class NotepadAutomationBot:
         title = post.get('title', 'Untitled Post')
         body = post.get('body', 'No content available.')
         
-        formatted_content = f"""BLOG POST #{post.get('id', 'Unknown')}
-
-        {title.upper()}
-
-        {body}
-
-        ---
-        Generated by TJM Automation Bot
-        Post ID: {post.get('id', 'Unknown')}
-        User ID: {post.get('userId', 'Unknown')}
-        """
+        formatted_content = (
+            f"BLOG POST #{post.get('id', 'Unknown')}\n\n"
+            f"{title.upper()}\n\n"
+            f"{body}\n\n"
+            f"---\n"
+            f"Generated by TJM Automation Bot\n"
+            f"Post ID: {post.get('id', 'Unknown')}\n"
+            f"User ID: {post.get('userId', 'Unknown')}\n"
+        )
         return formatted_content
     
     def process_single_post(self, post: Dict) -> bool:
@@ -455,14 +525,63 @@ def main():
             waits = {
                 'window': float(os.getenv('WINDOW_WAIT_TIME', '2')),
                 'save_dialog': float(os.getenv('SAVE_DIALOG_WAIT', '1')),
+                'file': float(os.getenv('FILE_SAVE_WAIT', '5')),
+                'close': float(os.getenv('CLOSE_WAIT', '1')),
+                'timing_margin': float(os.getenv('UI_TIMING_MARGIN', '1.5')),
+                'timing_floor': float(os.getenv('UI_TIMING_FLOOR', '0.02')),
             }
             log_level = os.getenv('LOG_LEVEL', 'INFO')
             log_file = os.getenv('LOG_FILE', 'tjm_automation.log')
+            log_rate_limit = int(os.getenv('LOG_RATE_LIMIT', '5'))
+            log_rate_window = float(os.getenv('LOG_RATE_WINDOW', '60'))
+            paste_chunk_size = int(os.getenv('PASTE_CHUNK_SIZE', '16384'))
             file_prefix = os.getenv('FILE_PREFIX', 'post')
             file_extension = os.getenv('FILE_EXTENSION', 'txt')
             num_posts = int(os.getenv('NUM_POSTS', '10'))
+            write_workers = int(os.getenv('WRITE_WORKERS', '4'))
+            pipeline_depth = int(os.getenv('PIPELINE_DEPTH', '0'))
+            http_pool_size = int(os.getenv('HTTP_POOL_SIZE', '10'))
+            stream_json = os.getenv('STREAM_JSON', 'false').lower() == 'true'
+            fetch_concurrency = int(os.getenv('FETCH_CONCURRENCY', '8'))
+            adaptive_concurrency = os.getenv('ADAPTIVE_CONCURRENCY', 'true').lower() == 'true'
+            latency_tolerance = float(os.getenv('API_LATENCY_TOLERANCE', '2'))
+            page_size = int(os.getenv('API_PAGE_SIZE', '0'))
+            incremental = os.getenv('INCREMENTAL', 'false').lower() == 'true'
+            cache_dir = output_dir / '.http-cache' if os.getenv('HTTP_CACHE', 'false').lower() == 'true' else None
+            cache_ttl = float(os.getenv('HTTP_CACHE_TTL', '0'))
+            cache_max_bytes = int(os.getenv('HTTP_CACHE_MAX_MB', '50')) * 1024 * 1024
+            verify_level = os.getenv('VERIFY_LEVEL', 'full-readback').lower()
+            hash_algorithm = os.getenv('HASH_ALGORITHM', 'sha256').lower()
+            atomic_writes = os.getenv('ATOMIC_WRITES', 'false').lower() == 'true'
+            fsync_batch = int(os.getenv('FSYNC_BATCH', '0'))
+            fsync_interval_ms = float(os.getenv('FSYNC_INTERVAL_MS', '0'))
+            disk_reserve = int(float(os.getenv('DISK_RESERVE_MB', '1')) * 1024 * 1024)
+            disk_check_interval = float(os.getenv('DISK_CHECK_INTERVAL', '5'))
+            output_sink = os.getenv('OUTPUT_SINK', 'files').lower()
+            dedup_store = os.getenv('DEDUP_STORE', 'false').lower() == 'true'
+            archive_name = os.getenv('ARCHIVE_NAME', 'posts')
+            gui_backend = None
+            if os.getenv('GUI_BACKEND', 'pyautogui').lower() == 'fake':
+                from robust import FakeNotepadBackend
+                gui_backend = FakeNotepadBackend()
+            metrics_file = Path(os.getenv('METRICS_FILE')) if os.getenv('METRICS_FILE') else None
+            metrics_format = os.getenv('METRICS_FORMAT', 'json').lower()
+            post_ids = [int(p) for p in os.getenv('POST_IDS', '').split(',') if p.strip()]
+            shards = int(os.getenv('SHARDS', '1'))
+            watch_interval = float(os.getenv('WATCH_INTERVAL', '0'))
+            watch_batch = int(os.getenv('WATCH_BATCH', '0'))
+            watch_since_param = os.getenv('WATCH_SINCE_PARAM', '').strip()
+            output_template = None
+            template_file = os.getenv('OUTPUT_TEMPLATE_FILE', '').strip()
+            if template_file:
+                try:
+                    output_template = Path(template_file).read_text(encoding='utf-8')
+                except OSError as e:
+                    logger.error(f"Cannot read OUTPUT_TEMPLATE_FILE {template_file}: {e}; using the default layout")
+            elif os.getenv('OUTPUT_TEMPLATE'):
+                output_template = os.getenv('OUTPUT_TEMPLATE').replace('\\n', '\n')
 
-            robust = RobustNotepadBot(
+            bot_kwargs = dict(
                 api_url=api_url,
                 api_timeout=api_timeout,
                 output_dir=output_dir,
@@ -471,8 +590,55 @@ def main():
                 waits=waits,
                 log_file=log_file,
                 log_level=log_level,
+                write_workers=write_workers,
+                pipeline_depth=pipeline_depth,
+                http_pool_size=http_pool_size,
+                stream_json=stream_json,
+                fetch_concurrency=fetch_concurrency,
+                adaptive_concurrency=adaptive_concurrency,
+                latency_tolerance=latency_tolerance,
+                page_size=page_size,
+                incremental=incremental,
+                cache_dir=cache_dir,
+                cache_ttl=cache_ttl,
+                cache_max_bytes=cache_max_bytes,
+                verify_level=verify_level,
+                hash_algorithm=hash_algorithm,
+                atomic_writes=atomic_writes,
+                fsync_batch=fsync_batch,
+                fsync_interval_ms=fsync_interval_ms,
+                disk_reserve=disk_reserve,
+                disk_check_interval=disk_check_interval,
+                output_sink=output_sink,
+                dedup_store=dedup_store,
+                archive_name=archive_name,
+                log_rate_limit=log_rate_limit,
+                log_rate_window=log_rate_window,
+                paste_chunk_size=paste_chunk_size,
+                gui_backend=gui_backend,
+                metrics_file=metrics_file,
+                metrics_format=metrics_format,
+                output_template=output_template,
             )
-            stats = robust.run(limit=num_posts, prefix=file_prefix, extension=file_extension)
+            if watch_interval > 0:
+                if shards > 1:
+                    logger.warning("SHARDS is ignored in watch mode")
+                robust = RobustNotepadBot(**bot_kwargs)
+            elif shards > 1:
+                from robust import ShardCoordinator
+                robust = ShardCoordinator(bot_kwargs, shards)
+            else:
+                robust = RobustNotepadBot(**bot_kwargs)
+            try:
+                if watch_interval > 0:
+                    # Runs until interrupted (Ctrl+C); the summary covers every cycle.
+                    stats = robust.watch(watch_interval, prefix=file_prefix, extension=file_extension,
+                                         batch=watch_batch, since_param=watch_since_param)
+                else:
+                    stats = robust.run(limit=num_posts, prefix=file_prefix, extension=file_extension,
+                                       post_ids=post_ids or None)
+            finally:
+                robust.close()
             # Prepare pseudo-bot to reuse summary printing
             class _Tmp:
                 def __init__(self, output_dir: Path):
@@ -515,4 +681,11 @@ def main():
 
 
 if __name__ == '__main__':
+    # Sharded runs start worker processes; frozen builds need this first.
+    multiprocessing.freeze_support()
+    configure_logging()
+    if '--startup-probe' in sys.argv[1:]:
+        # Exit once imports and configuration are done; used by
+        # benchmarks/bench_startup.py to time startup of source and frozen builds.
+        sys.exit(0)
     main()
\ No newline at end of file
@@ -1,7 +1,14 @@
 from .bot_impl import RobustNotepadBot
+from .gui_backends import GuiBackend, PyAutoGuiBackend, FakeNotepadBackend, HeadlessBackend
+from .sharding import ShardCoordinator
 
 __all__ = [
     'RobustNotepadBot',
+    'GuiBackend',
+    'PyAutoGuiBackend',
+    'FakeNotepadBackend',
+    'HeadlessBackend',
+    'ShardCoordinator',
 ]
 
 
@@ -1,48 +1,238 @@
-from typing import List, Dict, Optional
+from typing import Any, Iterable, Iterator, List, Dict, Optional
+import sys
+import json
 import time
+import random
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+
+from .http_cache import ResponseCache
+from .json_stream import JsonArrayStream
+from .limiter import AdaptiveLimiter, parse_retry_after
 
 
 class ApiClient:
-    def __init__(self, base_url: str, timeout: int, logger: logging.Logger):
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, base_url: str, timeout: int, logger: logging.Logger, pool_size: int = 10,
+                 stream_json: bool = False, cache: Optional[ResponseCache] = None,
+                 concurrency: int = 8, adaptive: bool = True, latency_tolerance: float = 2.0):
         self.base_url = base_url
         self.timeout = timeout
         self.logger = logger
+        self.stream_json = stream_json
+        self.cache = cache
+        self.retries_total = 0
+        self.session = self._build_session(max(1, int(pool_size)))
+        # Shared by every request, including the concurrent fetchers.
+        self.limiter = AdaptiveLimiter(concurrency, tolerance=latency_tolerance, adaptive=adaptive)
 
-    def _request_with_retries(self, method: str, url: str, retries: int = 3, backoff: float = 0.75) -> Optional[requests.Response]:
+    @staticmethod
+    def _build_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+        return session
+
+    def close(self) -> None:
+        try:
+            self.session.close()
+        except Exception as exc:
+            self.logger.warning("Failed to close HTTP session: %s", exc)
+
+    def send(self, method: str, url: str, **kwargs) -> requests.Response:
+        # One request through the limiter, which learns from its latency and
+        # status. Retry-After on a 429/503 holds back all requests.
+        # The slot is released whatever happens, or the cap would shrink for
+        # good.
+        self.limiter.acquire()
+        start = time.perf_counter()
+        resp: Optional[requests.Response] = None
+        try:
+            resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            return resp
+        finally:
+            latency = time.perf_counter() - start
+            if resp is None:
+                self.limiter.release(latency, congested=True)
+            elif resp.status_code in self.THROTTLE_STATUSES:
+                retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                if retry_after:
+                    self.logger.warning("API throttled (%d); pausing requests for %.1fs",
+                                        resp.status_code, retry_after)
+                self.limiter.release(latency, throttled=True, retry_after=retry_after)
+            else:
+                self.limiter.release(latency, congested=resp.status_code >= 500)
+
+    def _request_with_retries(self, method: str, url: str, retries: int = 3, backoff: float = 0.75,
+                              stream: bool = False,
+                              headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
         last_exc: Optional[Exception] = None
         for attempt in range(1, retries + 1):
+            resp: Optional[requests.Response] = None
             try:
-                resp = requests.request(method, url, timeout=self.timeout)
+                resp = self.send(method, url, stream=stream, headers=headers)
                 resp.raise_for_status()
                 return resp
             except requests.exceptions.RequestException as exc:
+                if resp is not None:
+                    # A streamed error body still holds its pooled connection.
+                    resp.close()
                 last_exc = exc
-                self.logger.warning(f"API {method} {url} attempt {attempt}/{retries} failed: {exc}")
-                time.sleep(backoff * attempt)
-        self.logger.error(f"API {method} {url} failed after {retries} attempts: {last_exc}")
+                self.retries_total += 1
+                self.logger.warning("API %s %s attempt %d/%d failed: %s", method, url, attempt, retries, exc)
+                if attempt < retries:
+                    # Full jitter; a Retry-After pause is enforced by the limiter.
+                    time.sleep(random.uniform(0, backoff * 2 ** (attempt - 1)))
+        self.logger.error("API %s %s failed after %d attempts: %s", method, url, retries, last_exc)
         return None
 
-    def fetch_posts(self, limit: int) -> List[Dict]:
-        response = self._request_with_retries('GET', self.base_url)
+    @staticmethod
+    def is_valid_post(item) -> bool:
+        return isinstance(item, dict) and 'title' in item and 'body' in item
+
+    def fetch_posts(self, limit: int, url: Optional[str] = None) -> List[Dict]:
+        url = url or self.base_url
+        if self.cache is not None:
+            return self._fetch_posts_cached(limit, url)
+        return self._fetch_posts_uncached(limit, url)
+
+    def _fetch_posts_uncached(self, limit: int, url: str) -> List[Dict]:
+        if self.stream_json:
+            return self._fetch_posts_streaming(limit, url)
+        response = self._request_with_retries('GET', url)
         if not response:
             return []
+        return self._parse_response(response, limit)
+
+    def _parse_response(self, response: requests.Response, limit: int) -> List[Dict]:
+        if self.stream_json:
+            return self._collect_stream(response.iter_content(self.STREAM_CHUNK_SIZE), response.encoding, limit)
         try:
             data = response.json()
-            if not isinstance(data, list):
-                self.logger.error("API returned non-list payload; aborting.")
-                return []
         except Exception as exc:
-            self.logger.error(f"Failed to parse JSON: {exc}")
+            self.logger.error("Failed to parse JSON: %s", exc)
             return []
+        return self._validate_list(data, limit)
 
+    def fetch_since(self, since_id: int, limit: int = 0, param: str = '') -> List[Dict]:
+        # Posts with an integer id above since_id, oldest first. 'param' names
+        # a server-side filter (json-server: id_gte) so the full feed is not
+        # downloaded on every poll; the result is filtered here either way.
+        url = self.base_url
+        if param:
+            url = f"{url}{'&' if '?' in url else '?'}{param}={since_id + 1}"
+        newer = sorted((post for post in self.fetch_posts(sys.maxsize, url)
+                        if isinstance(post.get('id'), int) and post['id'] > since_id),
+                       key=lambda post: post['id'])
+        return newer[:limit] if limit > 0 else newer
+
+    def _validate_list(self, data: Any, limit: int) -> List[Dict]:
+        if not isinstance(data, list):
+            self.logger.error("API returned non-list payload; aborting.")
+            return []
         validated: List[Dict] = []
         for item in data[:limit]:
-            if isinstance(item, dict) and 'title' in item and 'body' in item:
+            if self.is_valid_post(item):
                 validated.append(item)
             else:
-                self.logger.warning(f"Skipping malformed item: {str(item)[:120]}")
+                self.logger.warning("Skipping malformed item: %.120s", item)
         return validated
 
+    def _collect_stream(self, chunks: Iterable[bytes], encoding: Optional[str], limit: int) -> List[Dict]:
+        return list(self._iter_stream(chunks, encoding, limit))
+
+    def _iter_stream(self, chunks: Iterable[bytes], encoding: Optional[str], limit: int) -> Iterator[Dict]:
+        if limit <= 0:
+            return
+        count = 0
+        try:
+            for item in JsonArrayStream(chunks, encoding):
+                if self.is_valid_post(item):
+                    yield item
+                    count += 1
+                    if count >= limit:
+                        break
+                else:
+                    self.logger.warning("Skipping malformed item: %.120s", item)
+        except Exception as exc:
+            if not count:
+                self.logger.error("Failed to parse JSON stream: %s", exc)
+                return
+            self.logger.warning("JSON stream ended early after %d items: %s", count, exc)
+
+    def iter_posts(self, limit: int) -> Iterator[Dict]:
+        # Streaming without a cache hands out each post as soon as it is
+        # parsed off the wire; the other modes read the whole response first.
+        if not self.stream_json or self.cache is not None:
+            yield from self.fetch_posts(limit)
+            return
+        response = self._request_with_retries('GET', self.base_url, stream=True)
+        if not response:
+            return
+        try:
+            yield from self._iter_stream(response.iter_content(self.STREAM_CHUNK_SIZE), response.encoding, limit)
+        finally:
+            response.close()
+
+    def _fetch_posts_streaming(self, limit: int, url: str) -> List[Dict]:
+        response = self._request_with_retries('GET', url, stream=True)
+        if not response:
+            return []
+        try:
+            return self._collect_stream(response.iter_content(self.STREAM_CHUNK_SIZE), response.encoding, limit)
+        finally:
+            response.close()
+
+    def _fetch_posts_cached(self, limit: int, url: str) -> List[Dict]:
+        entry = self.cache.lookup(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.logger.info("Serving %s from cache (within TTL)", url)
+            return self._read_cached(entry, limit)
 
+        response = self._request_with_retries('GET', url, stream=True,
+                                              headers=self.cache.conditional_headers(entry))
+        if not response:
+            if entry is not None:
+                self.logger.warning("Serving stale cached response for %s", url)
+                return self._read_cached(entry, limit)
+            return []
+        try:
+            if response.status_code == 304 and entry is not None:
+                self.logger.info("%s not modified; serving from cache", url)
+                entry = self.cache.refresh(entry, response)
+            else:
+                entry = self.cache.store(url, response)
+                if entry is None and not response.raw.tell():
+                    # The cache could not even be opened; the body is unread.
+                    self.logger.warning("Parsing %s without caching it", url)
+                    return self._parse_response(response, limit)
+        finally:
+            response.close()
+        if entry is None:
+            # The body was consumed by the failed cache write; a failing
+            # cache must not cost the run its posts.
+            self.logger.warning("Refetching %s without the cache", url)
+            return self._fetch_posts_uncached(limit, url)
+        return self._read_cached(entry, limit)
+
+    def _read_cached(self, entry: Dict, limit: int) -> List[Dict]:
+        try:
+            with open(self.cache.body_path(entry), 'rb') as f:
+                if self.stream_json:
+                    chunks = iter(lambda: f.read(self.STREAM_CHUNK_SIZE), b'')
+                    return self._collect_stream(chunks, entry.get('encoding'), limit)
+                data = json.loads(f.read().decode(entry.get('encoding') or 'utf-8-sig', errors='replace'))
+        except Exception as exc:
+            self.logger.error("Failed to read cached response: %s", exc)
+            return []
+        return self._validate_list(data, limit)
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+import requests
+
+from .api import ApiClient
+
+
+class AsyncApiClient:
+    # Overlaps many blocking requests on the ApiClient's pooled session. The
+    # HTTP pool should be at least as large as the concurrency cap; the
+    # ApiClient's adaptive limiter decides how many are in flight below it.
+    def __init__(self, api: ApiClient, concurrency: int = 8, retries: int = 3, backoff: float = 0.5):
+        self.api = api
+        self.logger = api.logger
+        self.concurrency = max(1, int(concurrency))
+        self.retries = retries
+        self.backoff = backoff
+
+    async def _get_json(self, url: str, sem: asyncio.Semaphore, executor: ThreadPoolExecutor,
+                        params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        loop = asyncio.get_running_loop()
+        last_exc: Optional[Exception] = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                async with sem:
+                    resp = await loop.run_in_executor(
+                        executor, partial(self.api.send, 'GET', url, params=params)
+                    )
+                if resp.status_code == 404:
+                    self.logger.warning("API GET %s returned 404; skipping", url)
+                    return None
+                resp.raise_for_status()
+                return resp.json()
+            except (requests.exceptions.RequestException, ValueError) as exc:
+                last_exc = exc
+                self.api.retries_total += 1
+                self.logger.warning("API GET %s attempt %d/%d failed: %s", url, attempt, self.retries, exc)
+                if attempt < self.retries:
+                    await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+        self.logger.error("API GET %s failed after %d attempts: %s", url, self.retries, last_exc)
+        return None
+
+    async def _gather(self, requests_args: List[Dict[str, Any]]) -> List[Optional[Any]]:
+        sem = asyncio.Semaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='tjm-fetch') as executor:
+            tasks = [self._get_json(sem=sem, executor=executor, **args) for args in requests_args]
+            return await asyncio.gather(*tasks)
+
+    async def _each(self, requests_args: List[Dict[str, Any]], emit: Callable[[Optional[Any]], bool]) -> None:
+        # Like _gather, but each result is handed to 'emit' in request order
+        # as soon as it and those before it are in. Requests are scheduled
+        # from a window of 'concurrency' slots that only advances as results
+        # are emitted, so a slow early request holds back new ones instead of
+        # letting finished responses pile up behind it. emit may block; while
+        # it does, no new request starts. It returns False to cancel the rest.
+        sem = asyncio.Semaphore(self.concurrency)
+        pending = iter(requests_args)
+        window: Deque[asyncio.Future] = deque()
+
+        def schedule() -> None:
+            for args in pending:
+                window.append(asyncio.ensure_future(self._get_json(sem=sem, executor=executor, **args)))
+                if len(window) >= self.concurrency:
+                    break
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='tjm-fetch') as executor:
+            try:
+                schedule()
+                while window:
+                    if not emit(await window.popleft()):
+                        break
+                    schedule()
+            finally:
+                for task in window:
+                    task.cancel()
+                await asyncio.gather(*window, return_exceptions=True)
+
+    def _validate(self, items: Iterable[Any], limit: Optional[int] = None) -> List[Dict]:
+        validated: List[Dict] = []
+        for item in items:
+            if item is None:
+                continue
+            if ApiClient.is_valid_post(item):
+                validated.append(item)
+                if limit is not None and len(validated) >= limit:
+                    break
+            else:
+                self.logger.warning("Skipping malformed item: %.120s", item)
+        return validated
+
+    async def fetch_pages(self, limit: int, page_size: int) -> List[Dict]:
+        if limit <= 0 or page_size <= 0:
+            return []
+        pages = math.ceil(limit / page_size)
+        results = await self._gather([
+            {'url': self.api.base_url, 'params': {'_page': page, '_limit': page_size}}
+            for page in range(1, pages + 1)
+        ])
+        items: List[Any] = []
+        for page, payload in enumerate(results, 1):
+            if payload is None:
+                continue
+            if not isinstance(payload, list):
+                self.logger.error("API page %d returned non-list payload; skipping", page)
+                continue
+            items.extend(payload)
+        return self._validate(items, limit)
+
+    async def stream_pages(self, limit: int, page_size: int, emit: Callable[[Dict], bool]) -> None:
+        if limit <= 0 or page_size <= 0:
+            return
+        pages = math.ceil(limit / page_size)
+        sent = 0
+
+        def on_page(payload: Optional[Any]) -> bool:
+            nonlocal sent
+            if payload is None:
+                return True
+            if not isinstance(payload, list):
+                self.logger.error("API page returned non-list payload; skipping")
+                return True
+            for post in self._validate(payload, limit - sent):
+                if not emit(post):
+                    return False
+                sent += 1
+            return sent < limit
+
+        await self._each([{'url': self.api.base_url, 'params': {'_page': page, '_limit': page_size}}
+                          for page in range(1, pages + 1)], on_page)
+
+    async def stream_by_ids(self, post_ids: Iterable[int], emit: Callable[[Dict], bool]) -> None:
+        base = self.api.base_url.rstrip('/')
+
+        def on_post(payload: Optional[Any]) -> bool:
+            posts = self._validate([payload])
+            return emit(posts[0]) if posts else True
+
+        await self._each([{'url': f"{base}/{post_id}"} for post_id in post_ids], on_post)
+
+    async def fetch_by_ids(self, post_ids: Iterable[int]) -> List[Dict]:
+        base = self.api.base_url.rstrip('/')
+        results = await self._gather([{'url': f"{base}/{post_id}"} for post_id in post_ids])
+        return self._validate(results)
+
+    def fetch_pages_sync(self, limit: int, page_size: int) -> List[Dict]:
+        return asyncio.run(self.fetch_pages(limit, page_size))
+
+    def fetch_by_ids_sync(self, post_ids: Iterable[int]) -> List[Dict]:
+        return asyncio.run(self.fetch_by_ids(post_ids))
+
+    def stream_pages_sync(self, limit: int, page_size: int, emit: Callable[[Dict], bool]) -> None:
+        asyncio.run(self.stream_pages(limit, page_size, emit))
+
+    def stream_by_ids_sync(self, post_ids: Iterable[int], emit: Callable[[Dict], bool]) -> None:
+        asyncio.run(self.stream_by_ids(post_ids, emit))
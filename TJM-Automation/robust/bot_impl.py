@@ -1,17 +1,31 @@
 import os
+import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from .api import ApiClient
+from .http_cache import ResponseCache
 from .files import FileManager
 from .gui import GuiController
+from .gui_backends import GuiBackend, HeadlessBackend
 from .clipboard import ClipboardManager
 from .logging_setup import LoggerFactory
 from .lock import InstanceLock
+from .manifest import RunManifest
+from .metrics import RunReport
+from .pipeline import Pipeline
+from .template import PostTemplate
 
 
 class RobustNotepadBot:
+    VERIFY_LEVELS = ('none', 'size', 'hash-at-write', 'full-readback')
+    WATCH_STATE = '.tjm-watch.json'
+    # Cycles a failed post is retried in watch mode before it is given up on.
+    WATCH_RETRIES = 3
+
     def __init__(self,
                  api_url: str,
                  api_timeout: int,
@@ -20,107 +34,701 @@ class RobustNotepadBot:
                  typing_interval: float,
                  waits: Dict[str, float],
                  log_file: str,
-                 log_level: str = 'INFO'):
-        self.logger = LoggerFactory.create_logger('tjm.robust', log_file, log_level)
-        self.api = ApiClient(api_url, api_timeout, self.logger)
-        self.files = FileManager(output_dir, conflict_action, self.logger)
-        self.gui = GuiController(self.logger, typing_interval, waits)
-        self.clipboard = ClipboardManager(self.logger)
+                 log_level: str = 'INFO',
+                 write_workers: int = 4,
+                 http_pool_size: int = 10,
+                 stream_json: bool = False,
+                 fetch_concurrency: int = 8,
+                 page_size: int = 0,
+                 incremental: bool = False,
+                 cache_dir: Optional[Path] = None,
+                 cache_ttl: float = 0.0,
+                 cache_max_bytes: int = 50 * 1024 * 1024,
+                 verify_level: str = 'full-readback',
+                 hash_algorithm: str = 'sha256',
+                 atomic_writes: bool = False,
+                 fsync_batch: int = 0,
+                 fsync_interval_ms: float = 0,
+                 gui_backend: Optional[GuiBackend] = None,
+                 metrics_file: Optional[Path] = None,
+                 metrics_format: str = 'json',
+                 use_gui: bool = True,
+                 output_template: Optional[str] = None,
+                 disk_reserve: int = 1024 * 1024,
+                 disk_check_interval: float = 5.0,
+                 output_sink: str = 'files',
+                 archive_name: str = 'posts',
+                 log_rate_limit: int = 5,
+                 log_rate_window: float = 60.0,
+                 paste_chunk_size: int = 16384,
+                 pipeline_depth: int = 0,
+                 adaptive_concurrency: bool = True,
+                 latency_tolerance: float = 2.0,
+                 dedup_store: bool = False):
+        self.logger = LoggerFactory.create_logger('tjm.robust', log_file, log_level,
+                                                  rate_limit=log_rate_limit, rate_window=log_rate_window)
+        cache = ResponseCache(cache_dir, self.logger, cache_ttl, cache_max_bytes) if cache_dir else None
+        self.api = ApiClient(api_url, api_timeout, self.logger, pool_size=http_pool_size,
+                             stream_json=stream_json, cache=cache, concurrency=fetch_concurrency,
+                             adaptive=adaptive_concurrency, latency_tolerance=latency_tolerance)
+        self.fetch_concurrency = fetch_concurrency
+        self._async_api = None
+        self.page_size = max(0, int(page_size))
+        self.files = FileManager(output_dir, conflict_action, self.logger, hash_algorithm,
+                                 atomic_writes=atomic_writes, fsync_batch=fsync_batch,
+                                 fsync_interval_ms=fsync_interval_ms, disk_reserve=disk_reserve,
+                                 disk_check_interval=disk_check_interval, sink=output_sink,
+                                 archive_name=archive_name, dedup=dedup_store)
+        archived = self.files.sink is not None
+        if archived:
+            # Notepad cannot save into an archive, every archive starts empty
+            # (nothing to compare incrementally), and its members can only be
+            # checked through the hash recorded in the archive index.
+            use_gui = False
+            if incremental:
+                self.logger.warning('Incremental runs are not supported with archive output; writing all posts')
+                incremental = False
+            if verify_level in ('size', 'full-readback'):
+                verify_level = 'hash-at-write'
+        if not use_gui:
+            gui_backend = HeadlessBackend()
+        self.gui = GuiController(self.logger, typing_interval, waits, gui_backend,
+                                 paste_chunk_size=paste_chunk_size)
+        self.clipboard = ClipboardManager(self.logger, self.gui.backend)
         self.lock = InstanceLock(output_dir / '.run.lock', self.logger)
+        self.write_workers = max(1, int(write_workers))
+        self.pipeline_depth = max(0, int(pipeline_depth))
+        if verify_level not in self.VERIFY_LEVELS:
+            self.logger.warning("Unknown verification level %r; using full-readback", verify_level)
+            verify_level = 'full-readback'
+        self.verify_level = verify_level
+        self.manifest: Optional[RunManifest] = (
+            RunManifest(output_dir, self.logger, self.files.hash_algorithm) if incremental else None
+        )
+        self.metrics_file = Path(metrics_file) if metrics_file else None
+        self.metrics_format = metrics_format
+        self.report = RunReport()
+        self._done_ids: Optional[Set] = None
+        try:
+            self.template = PostTemplate(output_template)
+        except ValueError as exc:
+            self.logger.error("%s; using the default layout", exc)
+            self.template = PostTemplate()
 
-    def run(self, limit: int, prefix: str, extension: str) -> Dict[str, int]:
-        stats = {'total_posts': 0, 'successful_posts': 0, 'failed_posts': 0}
+    def run(self, limit: int, prefix: str, extension: str,
+            post_ids: Optional[List[int]] = None) -> RunReport:
+        stats = self.report = RunReport()
         if not self.lock.acquire():
-            return stats
+            return stats.finish()
+        retries_before = self.api.retries_total
         try:
             if not self.files.ensure_output_dir():
                 self.logger.error('Output directory not writable')
                 return stats
-            posts = self.api.fetch_posts(limit)
+            if self.pipeline_depth and not self.gui.backend.supported():
+                self._execute_streaming(limit, post_ids, prefix, extension, stats)
+                return stats
+            with stats.span('fetch'):
+                posts = self._fetch(limit, post_ids)
             if not posts:
                 return stats
-            stats['total_posts'] = len(posts)
-
-            is_windows = os.name == 'nt'
-            if is_windows:
-                if not self.gui.launch_or_focus_notepad():
-                    self.logger.error('GUI automation unavailable; degrading to direct writes')
-                    is_windows = False
-
-            for idx, post in enumerate(posts, 1):
-                post_id = post.get('id', idx)
-                raw_name = f"{prefix} {post_id}"
-                filename = self.files.sanitize_filename(raw_name, extension)
-                target = self.files.resolve_conflict(self.files.output_dir / filename)
-                if target is None:
-                    stats['successful_posts'] += 1
-                    continue
-                content = self._format_post(post)
+            self._execute(posts, prefix, extension, stats)
+            return stats
+        finally:
+            self.lock.release()
+            self._close_report(stats, retries_before)
+            self._export_metrics(stats)
 
-                if not self.files.has_enough_space(len(content.encode('utf-8', errors='replace')) + 1024):
-                    self.logger.error('Insufficient disk space; aborting remaining tasks')
+    def run_shard(self, posts: List[Dict], prefix: str, extension: str, lease: InstanceLock,
+                  indices: Optional[List[int]] = None) -> RunReport:
+        # Worker side of a sharded run: the coordinator fetched the posts and
+        # owns the manifest file and metrics export, and the shard's lease
+        # stands in for the run lock. 'indices' are the posts' positions in
+        # the whole fetch, so id-less posts get the same names as unsharded.
+        stats = self.report = RunReport()
+        if not lease.acquire():
+            stats['total_posts'] = stats['failed_posts'] = len(posts)
+            stats.incr('shard_lease_conflicts')
+            return stats.finish()
+        retries_before = self.api.retries_total
+        try:
+            if not self.files.ensure_output_dir():
+                self.logger.error('Output directory not writable')
+                return stats
+            self._execute(posts, prefix, extension, stats, save_manifest=False, indices=indices)
+            return stats
+        finally:
+            lease.release()
+            self._close_report(stats, retries_before)
+
+    def watch(self, interval: float, prefix: str, extension: str, batch: int = 0,
+              since_param: str = '', max_cycles: int = 0,
+              stop: Optional[threading.Event] = None) -> RunReport:
+        # Daemon mode. The run lock, HTTP session, logger, Notepad window,
+        # manifest and directory index stay up between polls, and each cycle
+        # handles only posts with ids above the highest one seen so far.
+        # Failed posts are fetched again by id on the next few cycles. The
+        # returned report holds totals across cycles; metrics are exported per
+        # cycle that had work.
+        totals = RunReport()
+        if self.files.sink is not None:
+            self.logger.error('Watch mode writes one file per post; archive output is not supported')
+            return totals.finish()
+        if not self.lock.acquire():
+            return totals.finish()
+        stop = stop or threading.Event()
+        self._done_ids = set()
+        try:
+            if not self.files.ensure_output_dir():
+                self.logger.error('Output directory not writable')
+                return totals
+            if self.manifest is not None:
+                self.manifest.load()
+            since_id, retries = self._load_watch_state()
+            self.logger.info("Watching %s every %.1fs for posts after id %d", self.api.base_url, interval, since_id)
+            cycles = 0
+            while not stop.is_set():
+                cycle_start = time.monotonic()
+                stats = self.report = RunReport()
+                retries_before = self.api.retries_total
+                posts: List[Dict] = []
+                try:
+                    with stats.span('fetch'):
+                        posts = self.api.fetch_since(since_id, batch, since_param)
+                        if retries:
+                            posts = self.async_api.fetch_by_ids_sync(sorted(retries)) + posts
+                    if posts:
+                        self._done_ids.clear()
+                        self._execute(posts, prefix, extension, stats, warm=True)
+                        if stats['failed_posts']:
+                            # Names claimed by failed posts were never written;
+                            # re-scan before they are retried.
+                            self.files.reset_claims()
+                        since_id, retries = self._advance_watch(since_id, retries, posts)
+                        self._save_watch_state(since_id, retries)
+                except Exception as exc:
+                    # A bad cycle must not take the daemon down; the same
+                    # posts come round again on the next poll.
+                    self.logger.error("Watch cycle failed: %s", exc)
+                    stats.incr('watch_cycle_errors')
+                finally:
+                    if posts:
+                        self._close_report(stats, retries_before)
+                        stats.set_gauge('watch_since_id', since_id)
+                        self._export_metrics(stats)
+                    else:
+                        # Idle poll: file counters still hold the last busy cycle.
+                        stats.incr('api_retries', self.api.retries_total - retries_before)
+                totals.merge({'stats': dict(stats), 'counters': stats.counters})
+                totals.incr('watch_cycles')
+                cycles += 1
+                if max_cycles and cycles >= max_cycles:
                     break
+                stop.wait(max(0.0, interval - (time.monotonic() - cycle_start)))
+            totals.set_gauge('watch_since_id', since_id)
+            return totals
+        except KeyboardInterrupt:
+            self.logger.info('Watch interrupted')
+            return totals
+        finally:
+            self._done_ids = None
+            try:
+                self.gui.close_notepad()
+            except Exception:
+                pass
+            self.lock.release()
+            totals.finish()
 
-                ok: bool
-                if is_windows:
-                    ok = self._process_via_gui(target, content)
-                else:
-                    ok = self.files.write_text(target, content)
+    def _advance_watch(self, since_id: int, retries: Dict[int, int],
+                       posts: List[Dict]) -> Tuple[int, Dict[int, int]]:
+        # Retried ids that could not be fetched again count as failed too.
+        ids = {post['id'] for post in posts if isinstance(post.get('id'), int)}
+        since_id = max(ids | {since_id})
+        pending: Dict[int, int] = {}
+        for post_id in sorted(ids | set(retries)):
+            if post_id in self._done_ids:
+                continue
+            attempts = retries.get(post_id, 0) + 1
+            if attempts > self.WATCH_RETRIES:
+                self.logger.error("Giving up on post %d after %d attempts", post_id, attempts)
+            else:
+                pending[post_id] = attempts
+        return since_id, pending
+
+    def _load_watch_state(self) -> Tuple[int, Dict[int, int]]:
+        # Resumes from the last saved cycle; without one, posts already in the
+        # manifest count as handled.
+        path = self.files.output_dir / self.WATCH_STATE
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return int(data.get('since_id', 0)), {int(k): int(v) for k, v in data.get('retries', {}).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            self.logger.warning("Ignoring unreadable watch state %s: %s", path.name, exc)
+        if self.manifest is not None:
+            ids = [int(key) for key in self.manifest.entries if key.isdigit()]
+            return max(ids, default=0), {}
+        return 0, {}
+
+    def _save_watch_state(self, since_id: int, retries: Dict[int, int]) -> None:
+        path = self.files.output_dir / self.WATCH_STATE
+        tmp = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'since_id': since_id, 'retries': {str(k): v for k, v in retries.items()}}, f)
+            os.replace(tmp, path)
+        except OSError as exc:
+            self.logger.warning("Failed to save watch state: %s", exc)
+
+    def _execute(self, posts: List[Dict], prefix: str, extension: str, stats: RunReport,
+                 save_manifest: bool = True, warm: bool = False, indices: Optional[List[int]] = None) -> None:
+        # warm: called from watch(), which owns the run lock for its whole
+        # lifetime. Notepad stays open, and the manifest and directory index
+        # loaded by earlier cycles are reused instead of re-read.
+        stats['total_posts'] = len(posts)
+        with stats.span('disk_check'):
+            fits = self.files.space.begin(sum(self._estimate_size(post) for post in posts))
+        if not fits:
+            # The batch would stop part-way through; refuse it up front.
+            self.logger.error('Insufficient disk space for this batch; no posts written')
+            stats.incr('disk_space_aborts')
+            stats['failed_posts'] = len(posts)
+            return
+        use_gui = self.gui.backend.supported()
+        if use_gui:
+            with stats.span('gui_launch'):
+                launched = self.gui.launch_or_focus_notepad()
+            if not launched:
+                self.logger.error('GUI automation unavailable; degrading to direct writes')
+                use_gui = False
+
+        self.files.reset_claims(keep_index=warm)
+        if not self.files.open_sink():
+            stats['failed_posts'] = len(posts)
+            return
+        if self.manifest is not None and not warm:
+            self.manifest.load()
+        numbered = list(zip(indices, posts)) if indices is not None else list(enumerate(posts, 1))
+        if use_gui:
+            self._run_gui(numbered, prefix, extension, stats)
+        else:
+            self._run_direct(numbered, prefix, extension, stats)
+        self._finish_batch(stats, save_manifest)
+
+        if warm:
+            return
+        try:
+            self.gui.close_notepad()
+        except Exception:
+            pass
+
+    def _execute_streaming(self, limit: int, post_ids: Optional[List[int]], prefix: str, extension: str,
+                           stats: RunReport) -> None:
+        # Direct-write runs: fetch, render, write and verify overlap, so the
+        # first file lands while later posts are still downloading.
+        with stats.span('disk_check'):
+            # The batch size is not known up front: only the reserve is
+            # checked here, and writes draw on the space budget one by one.
+            fits = self.files.space.begin(0)
+        if not fits:
+            self.logger.error('Insufficient disk space; no posts fetched')
+            stats.incr('disk_space_aborts')
+            return
+        self.files.reset_claims()
+        if not self.files.open_sink():
+            return
+        if self.manifest is not None:
+            self.manifest.load()
+        self._run_pipeline(lambda emit: self._produce(limit, post_ids, emit), prefix, extension, stats)
+        self._finish_batch(stats, save_manifest=True)
+
+    def _finish_batch(self, stats: RunReport, save_manifest: bool) -> None:
+        with stats.span('flush'):
+            flushed = self.files.flush()
+        if not flushed:
+            self.logger.error('Failed to flush written files to disk')
+        if self.manifest is not None and save_manifest:
+            with stats.span('manifest'):
+                self.manifest.save()
+
+    def _close_report(self, stats: RunReport, retries_before: int) -> None:
+        stats.incr('api_retries', self.api.retries_total - retries_before)
+        stats.incr('api_throttled', self.api.limiter.take_throttled())
+        stats.set_gauge('api_concurrency_limit', self.api.limiter.limit)
+        for outcome, count in self.files.conflict_outcomes.items():
+            stats.incr(f"conflict_{outcome}", count)
+        stats.incr('disk_space_queries', self.files.space.queries)
+        if self.files.store is not None:
+            for name, count in self.files.store.counts.items():
+                stats.incr(name, count)
+        stats.finish()
+
+    def _export_metrics(self, stats: RunReport) -> None:
+        if self.metrics_file is None:
+            return
+        try:
+            stats.export(self.metrics_file, self.metrics_format)
+        except Exception as exc:
+            self.logger.warning("Failed to export metrics to %s: %s", self.metrics_file, exc)
+
+    @property
+    def async_api(self):
+        # asyncio is only loaded for id/paged fetches.
+        if self._async_api is None:
+            from .async_api import AsyncApiClient
+            self._async_api = AsyncApiClient(self.api, self.fetch_concurrency)
+        return self._async_api
 
-                if ok and self._verify_file_integrity(target, content):
+    def _fetch(self, limit: int, post_ids: Optional[List[int]]) -> List[Dict]:
+        if post_ids:
+            return self.async_api.fetch_by_ids_sync(post_ids[:limit] if limit > 0 else post_ids)
+        if self.page_size:
+            return self.async_api.fetch_pages_sync(limit, self.page_size)
+        return self.api.fetch_posts(limit)
+
+    def _produce(self, limit: int, post_ids: Optional[List[int]], emit: Callable[[Dict], bool]) -> None:
+        # Incremental counterpart of _fetch: hands posts to emit as they come in.
+        if post_ids:
+            self.async_api.stream_by_ids_sync(post_ids[:limit] if limit > 0 else post_ids, emit)
+        elif self.page_size:
+            self.async_api.stream_pages_sync(limit, self.page_size, emit)
+        else:
+            for post in self.api.iter_posts(limit):
+                if not emit(post):
+                    break
+
+    def close(self) -> None:
+        self.api.close()
+        LoggerFactory.flush()
+
+    def _base_name(self, idx: int, post: Dict, prefix: str, extension: str) -> str:
+        # The name a post gets before conflict resolution.
+        return self.files.sanitize_filename(f"{prefix} {post.get('id', idx)}", extension)
+
+    def _plan(self, idx: int, post: Dict, prefix: str,
+              extension: str) -> Tuple[Optional[Path], Optional[bytes], str]:
+        # (target, rendered bytes if already rendered, base name). Posts
+        # already in the manifest under the same base name are compared by
+        # content hash only; the file on disk is neither opened nor stat'ed.
+        # Changed posts go back to the filename recorded for them through
+        # FILE_CONFLICT_ACTION, so a 'skip' or 'rename' policy protects a file
+        # the user has edited. A different base name (FILE_PREFIX or
+        # FILE_EXTENSION changed) is treated as a new post.
+        base = self._base_name(idx, post, prefix, extension)
+        data: Optional[bytes] = None
+        if self.manifest is not None:
+            entry = self.manifest.lookup(post.get('id', idx))
+            if entry is not None and entry.get('filename') and entry.get('base') == base:
+                with self.report.span('format'):
+                    data = self._render_post(post)
+                if entry.get('hash') == self.files.hash_bytes(data):
+                    self.report.incr('posts_unchanged')
+                    return None, None, base
+                return self.files.resolve_conflict(self.files.output_dir / entry['filename']), data, base
+        return self.files.resolve_conflict(self.files.output_dir / base), data, base
+
+    def _mark_done(self, idx: int, post: Dict) -> None:
+        if self._done_ids is not None:
+            self._done_ids.add(post.get('id', idx))
+
+    def _record(self, idx: int, post: Dict, base: str, target: Path, data: bytes,
+                digest: Optional[str] = None) -> None:
+        self._mark_done(idx, post)
+        if self.manifest is not None:
+            digest = digest or self.files.hash_bytes(data)
+            self.manifest.record(post.get('id', idx), target.name, digest, len(data), base)
+
+    def _run_gui(self, numbered: List[Tuple[int, Dict]], prefix: str, extension: str, stats: RunReport) -> None:
+        for idx, post in numbered:
+            post_start = time.perf_counter()
+            with stats.span('resolve'):
+                target, data, base = self._plan(idx, post, prefix, extension)
+            if target is None:
+                self._mark_done(idx, post)
+                stats['successful_posts'] += 1
+                continue
+            with stats.span('format'):
+                content = self._format_post(post)
+                if data is None:
+                    data = self._render_post(post)
+
+            with stats.span('disk_check'):
+                enough = self.files.reserve_space(len(data))
+            if not enough:
+                self.logger.error('Insufficient disk space; aborting remaining tasks')
+                stats.incr('disk_space_aborts')
+                break
+
+            # Notepad writes the file itself, so anything stronger than 'none'
+            # has to read it back.
+            ok = self._process_via_gui(target, content, data)
+            if ok and self.verify_level != 'none':
+                with stats.span('verify'):
+                    ok = self._verify_file_integrity(target, data)
+            ok = self._settle(target, ok)
+            if ok:
+                self._record(idx, post, base, target, data)
+                stats['successful_posts'] += 1
+            else:
+                stats['failed_posts'] += 1
+            stats.observe('post', time.perf_counter() - post_start)
+            self.gui.wait_ready()
+
+    def _run_pipeline(self, produce: Callable[[Callable[[Dict], bool]], None], prefix: str, extension: str,
+                      stats: RunReport) -> None:
+        # fetch -> render -> write -> verify over bounded queues. Rendering
+        # also resolves names, on one thread, so they are handed out in feed
+        # order exactly as in _run_direct.
+        abort = threading.Event()
+        counts = threading.Lock()
+
+        def count(key: str) -> None:
+            with counts:
+                stats[key] += 1
+
+        def source(emit: Callable[[Tuple], bool]) -> None:
+            # 'fetch' is the time spent upstream; time blocked on a full
+            # render queue is backpressure and reported as 'fetch_blocked'.
+            blocked = 0.0
+
+            def send(post: Dict) -> bool:
+                nonlocal blocked
+                stats['total_posts'] += 1
+                start = time.perf_counter()
+                try:
+                    return emit((stats['total_posts'], post))
+                finally:
+                    blocked += time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                produce(send)
+            finally:
+                stats.observe('fetch', time.perf_counter() - start - blocked)
+                stats.observe('fetch_blocked', blocked)
+
+        def render(item: Tuple) -> Optional[Tuple]:
+            idx, post = item
+            start = time.perf_counter()
+            with stats.span('resolve'):
+                target, data, base = self._plan(idx, post, prefix, extension)
+            if target is None:
+                self._mark_done(idx, post)
+                count('successful_posts')
+                return None
+            if data is None:
+                with stats.span('format'):
+                    data = self._render_post(post)
+            with stats.span('disk_check'):
+                enough = self.files.reserve_space(len(data))
+            if not enough:
+                abort.set()
+                stats.incr('disk_space_aborts')
+                self.logger.error('Insufficient disk space; aborting remaining tasks')
+                return None
+            return idx, post, target, data, start, base
+
+        def write(item: Tuple) -> Optional[Tuple]:
+            with stats.span('write'):
+                written, digest = self._write(item[2], item[3])
+            if not written:
+                count('failed_posts')
+                stats.observe('post', time.perf_counter() - item[4])
+                return None
+            return item + (digest,)
+
+        def verify(item: Tuple) -> None:
+            idx, post, target, data, start, base, digest = item
+            with stats.span('verify'):
+                ok, digest = self._verify_written(target, data, digest)
+            if self._settle(target, ok):
+                self._record(idx, post, base, target, data, digest)
+                count('successful_posts')
+            else:
+                count('failed_posts')
+            stats.observe('post', time.perf_counter() - start)
+
+        pipeline = Pipeline(self.logger, self.pipeline_depth, abort)
+        pipeline.stage('render', render)
+        pipeline.stage('write', write, self.write_workers)
+        pipeline.stage('verify', verify, self.write_workers)
+        pipeline.run(source)
+        for stage, errors in pipeline.errors.items():
+            stats.incr(f"pipeline_errors_{stage}", errors)
+            if stage != 'source':
+                # The post that raised was neither recorded nor counted.
+                stats['failed_posts'] += errors
+        for stage, stalls in pipeline.stalls.items():
+            stats.incr(f"pipeline_stalls_{stage}", stalls)
+
+    def _run_direct(self, numbered: List[Tuple[int, Dict]], prefix: str, extension: str, stats: RunReport) -> None:
+        # Names are resolved up front on this thread so rename/skip decisions
+        # stay deterministic; format/write/verify fan out to the pool.
+        abort = threading.Event()
+        jobs = []
+        for idx, post in numbered:
+            with stats.span('resolve'):
+                target, data, base = self._plan(idx, post, prefix, extension)
+            if target is None:
+                self._mark_done(idx, post)
+                stats['successful_posts'] += 1
+                continue
+            jobs.append((idx, post, base, target, data))
+
+        workers = min(self.write_workers, max(1, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tjm-writer') as pool:
+            futures = [pool.submit(self._process_direct, *job, abort) for job in jobs]
+            for future in futures:
+                try:
+                    ok = future.result()
+                except Exception as exc:
+                    self.logger.error("Direct write worker failed: %s", exc)
+                    ok = False
+                if ok is None:
+                    continue
+                if ok:
                     stats['successful_posts'] += 1
                 else:
                     stats['failed_posts'] += 1
-                time.sleep(0.3)
 
-            try:
-                self.gui.close_notepad()
-            except Exception:
-                pass
-            return stats
+    def _process_direct(self, idx: int, post: Dict, base: str, target: Path, data: Optional[bytes],
+                        abort: threading.Event) -> Optional[bool]:
+        if abort.is_set():
+            return None
+        report = self.report
+        post_start = time.perf_counter()
+        try:
+            if data is None:
+                with report.span('format'):
+                    data = self._render_post(post)
+            with report.span('disk_check'):
+                enough = self.files.reserve_space(len(data))
+            if not enough:
+                if not abort.is_set():
+                    abort.set()
+                    report.incr('disk_space_aborts')
+                    self.logger.error('Insufficient disk space; aborting remaining tasks')
+                return None
+            with report.span('write'):
+                written, digest = self._write(target, data)
+            if not written:
+                return False
+            with report.span('verify'):
+                ok, digest = self._verify_written(target, data, digest)
+            if not self._settle(target, ok):
+                return False
+            self._record(idx, post, base, target, data, digest)
+            return True
         finally:
-            self.lock.release()
+            report.observe('post', time.perf_counter() - post_start)
+
+    def _write(self, target: Path, data: bytes) -> Tuple[bool, Optional[str]]:
+        # With the content store the buffer is hashed once, here; the digest
+        # names the blob and is reused by verification and the manifest.
+        digest = self.files.hash_bytes(data) if self.files.store is not None else None
+        return self.files.write_bytes(target, data, digest), digest
 
-    def _process_via_gui(self, target: Path, content: str) -> bool:
-        if not self.gui.replace_editor_text(content, self.clipboard):
+    def _settle(self, target: Path, ok: bool) -> bool:
+        # A staged write only moves to its final name once it has verified.
+        if not ok:
+            self.files.discard(target)
             return False
-        if not self.gui.save_via_ui(target.parent, target.name):
-            self.gui.handle_unexpected_dialogs()
+        return self.files.commit(target)
+
+    def _verify_written(self, target: Path, data: bytes,
+                        digest: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        # (ok, digest); digest stays None when nothing hashed the buffer.
+        if self.verify_level == 'size':
+            return self._verify_size(target, len(data)), digest
+        if self.verify_level == 'hash-at-write':
+            # write_bytes already rejected short writes; the digest of the
+            # exact buffer handed to the OS is the integrity record, taken by
+            # _record only when there is a manifest to keep it in.
+            return True, digest
+        if self.verify_level == 'full-readback':
+            store = self.files.store
+            if store is not None and digest is not None:
+                # Posts linked to one blob share an inode; reading it back
+                # once per run covers them all.
+                written = self.files.staged_path(target)
+                if store.verified_link(written, digest):
+                    self.report.incr('dedup_verify_skipped')
+                    return True, digest
+                ok = self._verify_file_integrity(target, data)
+                if not ok:
+                    # The blob may have been damaged since it was checked;
+                    # put() compares it again and rewrites it before relinking.
+                    store.forget(digest)
+                    self.files.discard(target)
+                    ok = self.files.write_bytes(target, data, digest) and self._verify_file_integrity(target, data)
+                    written = self.files.staged_path(target)
+                if ok:
+                    store.mark_verified(written, digest)
+                return ok, digest
+            return self._verify_file_integrity(target, data), digest
+        return True, digest
+
+    def _verify_size(self, path: Path, expected: int) -> bool:
+        try:
+            actual = self.files.staged_path(path).stat().st_size
+        except OSError as exc:
+            self.logger.warning("Could not stat saved file for size check: %s: %s", path.name, exc)
+            return False
+        if actual != expected:
+            self.logger.warning("Size mismatch for %s: %d != %d", path.name, actual, expected)
+            return False
+        return True
+
+    def _process_via_gui(self, target: Path, content: str, data: bytes) -> bool:
+        typed_before = self.gui.typed_chunks
+        with self.report.span('gui_input'):
+            entered = self.gui.replace_editor_text(content, self.clipboard)
+        if self.gui.typed_chunks > typed_before:
+            self.report.incr('gui_typed_chunks', self.gui.typed_chunks - typed_before)
+        if not entered:
+            return False
+        if self.files.shared_inodes:
+            self.files.detach(target)
+        with self.report.span('gui_save'):
+            if not self.gui.save_via_ui(target.parent, target.name):
+                self.gui.handle_unexpected_dialogs()
         if not target.exists():
             self.logger.warning('UI save did not create file; attempting direct write')
-            return self.files.write_text(target, content)
+            self.report.incr('gui_save_fallbacks')
+            with self.report.span('write'):
+                return self._write(target, data)[0]
         return True
 
-    def _verify_file_integrity(self, path: Path, content: str) -> bool:
-        def normalize_text(text: str) -> str:
-            return text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', os.linesep)
+    def _verify_file_integrity(self, path: Path, data: bytes) -> bool:
+        # Line endings are compared normalised to LF so files re-saved by
+        # Notepad with CRLF still match.
+        def normalize(raw: bytes) -> bytes:
+            return raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
 
-        expected_text = normalize_text(content)
-        expected_hash = self.files.sha256_of_text(expected_text)
+        expected = normalize(data)
         try:
-            with open(path, 'r', encoding='utf-8', errors='replace', newline=None) as f:
-                saved_text = f.read()
+            with open(self.files.staged_path(path), 'rb') as f:
+                saved = f.read()
         except Exception as exc:
-            self.logger.warning(f"Could not read saved file for integrity check: {path.name}: {exc}")
+            self.logger.warning("Could not read saved file for integrity check: %s: %s", path.name, exc)
             return False
-        actual_text = normalize_text(saved_text)
-        actual_hash = self.files.sha256_of_text(actual_text)
-        if expected_hash != actual_hash:
-            self.logger.warning(f"Hash mismatch for {path.name}")
+        if self.files.hash_bytes(expected) != self.files.hash_bytes(normalize(saved)):
+            self.logger.warning("Hash mismatch for %s", path.name)
             return False
         return True
 
     @staticmethod
-    def _format_post(post: Dict) -> str:
-        title = str(post.get('title', 'Untitled Post'))
-        body = str(post.get('body', 'No content available.'))
-        return (
-            f"BLOG POST #{post.get('id', 'Unknown')}\n\n"
-            f"{title.upper()}\n\n"
-            f"{body}\n\n"
-            f"---\nGenerated by TJM Automation Bot\n"
-            f"Post ID: {post.get('id', 'Unknown')}\n"
-            f"User ID: {post.get('userId', 'Unknown')}\n"
-        )
+    def _estimate_size(post: Dict) -> int:
+        # Rough on-disk size before rendering: title and body plus the
+        # template's fixed text.
+        return len(str(post.get('title', ''))) + len(str(post.get('body', ''))) + 256
+
+    def _format_post(self, post: Dict) -> str:
+        return self.template.render_text(post)
+
+    def _render_post(self, post: Dict) -> bytes:
+        return self.template.render(post)
 
 
@@ -1,24 +1,53 @@
+import zlib
 import logging
-import pyperclip
+from typing import List, Tuple
+
+from .gui_backends import GuiBackend
+
+
+def normalize_newlines(text: str) -> str:
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def fingerprint(text: str) -> Tuple[int, int]:
+    # Length first so most mismatches are caught without hashing anything.
+    return len(text), zlib.crc32(text.encode('utf-8', errors='surrogatepass'))
+
+
+def split_chunks(text: str, size: int) -> List[str]:
+    # Bounded pieces, cut after a newline where one falls in the second half
+    # of the window so a typed fallback chunk starts on a fresh line.
+    if size <= 0 or len(text) <= size:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            cut = text.rfind('\n', start + size // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunks.append(text[start:end])
+        start = end
+    return chunks
 
 
 class ClipboardManager:
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, backend: GuiBackend):
         self.logger = logger
+        self.backend = backend
 
     def set_text(self, text: str) -> bool:
         try:
-            pyperclip.copy(text)
+            self.backend.set_clipboard(text)
             return True
         except Exception as exc:
-            self.logger.warning(f"Clipboard set failed: {exc}")
+            self.logger.warning("Clipboard set failed: %s", exc)
             return False
 
     def get_text(self) -> str:
         try:
-            return pyperclip.paste()
+            return self.backend.get_clipboard()
         except Exception as exc:
-            self.logger.warning(f"Clipboard get failed: {exc}")
+            self.logger.warning("Clipboard get failed: %s", exc)
             return ''
-
-
@@ -1,25 +1,458 @@
 import os
+import re
+import errno
 import shutil
 import hashlib
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+from .sinks import SINKS, ArchiveSink
+
+
+class GroupCommit:
+    # Batches fsync calls: files are flushed together, followed by a single
+    # directory fsync, once 'batch' files are pending or 'interval_ms' has
+    # passed since the last commit (batch 0 leaves only the interval). A timer
+    # commits a partial batch whose interval runs out while no more writes
+    # arrive; a failure there is reported by the next flush(), which commits
+    # whatever is left. A file added with a staged temp name is renamed onto
+    # its target only after its data has been flushed, so after a crash the
+    # target holds either the old file or the complete new one.
+    def __init__(self, logger: logging.Logger, batch: int, interval_ms: float = 0):
+        self.logger = logger
+        self.batch = max(0, int(batch))
+        self.interval = max(0.0, float(interval_ms)) / 1000.0
+        if not self.batch and not self.interval:
+            self.batch = 1
+        self._pending: List[Tuple[Path, Optional[Path]]] = []
+        self._lock = threading.Lock()
+        self._last_commit = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._deadline_failed = False
+
+    def add(self, path: Path, staged: Optional[Path] = None) -> bool:
+        with self._lock:
+            self._pending.append((path, staged))
+            remaining = self.interval - (time.monotonic() - self._last_commit)
+            due = (self.batch and len(self._pending) >= self.batch) or (self.interval and remaining <= 0)
+            if not due:
+                if self.interval and self._timer is None:
+                    self._timer = threading.Timer(remaining, self._on_deadline)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return True
+            return self._commit_locked()
+
+    def flush(self) -> bool:
+        with self._lock:
+            ok = self._commit_locked() and not self._deadline_failed
+            self._deadline_failed = False
+            return ok
+
+    def _on_deadline(self) -> None:
+        with self._lock:
+            # A commit since this timer was armed has already cancelled it.
+            if self._timer is not threading.current_thread():
+                return
+            self._timer = None
+            if not self._commit_locked():
+                self._deadline_failed = True
+
+    def _commit_locked(self) -> bool:
+        pending, self._pending = self._pending, []
+        self._last_commit = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not pending:
+            return True
+        ok = True
+        renames: List[Tuple[Path, Path]] = []
+        for path, staged in pending:
+            try:
+                self._fsync_path(staged or path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+            except OSError as exc:
+                self.logger.error("fsync failed for %s: %s", path, exc)
+                ok = False
+                if staged is not None:
+                    self._unlink(staged)
+                continue
+            if staged is not None:
+                renames.append((staged, path))
+        for staged, path in renames:
+            try:
+                os.replace(staged, path)
+            except OSError as exc:
+                self.logger.error("Failed to move %s into place: %s", path, exc)
+                self._unlink(staged)
+                ok = False
+        # Windows cannot open directories for fsync; NTFS journals the rename.
+        if os.name != 'nt':
+            for directory in {path.parent for path, _ in pending}:
+                try:
+                    self._fsync_path(directory, os.O_RDONLY)
+                except OSError as exc:
+                    self.logger.error("fsync failed for directory %s: %s", directory, exc)
+                    ok = False
+        return ok
+
+    @staticmethod
+    def _fsync_path(path: Path, flags: int) -> None:
+        fd = os.open(path, flags)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+class SpaceBudget:
+    # Free space is measured once and then debited locally as files are
+    # written. The filesystem is asked again only when the local headroom
+    # above the reserve falls under 'refresh_bytes' or 'interval' seconds
+    # have passed, and always before refusing a write.
+    BLOCK = 4096
+
+    def __init__(self, directory: Path, logger: logging.Logger, reserve: int = 1024 * 1024,
+                 refresh_bytes: int = 64 * 1024 * 1024, interval: float = 5.0):
+        self.directory = directory
+        self.logger = logger
+        self.reserve = max(0, int(reserve))
+        self.refresh_bytes = max(0, int(refresh_bytes))
+        self.interval = max(0.0, float(interval))
+        self.queries = 0
+        self._free: Optional[int] = None
+        self._measured_at = 0.0
+        self._lock = threading.Lock()
+
+    def _measure(self) -> Optional[int]:
+        self.queries += 1
+        self._measured_at = time.monotonic()
+        try:
+            self._free = shutil.disk_usage(self.directory).free
+        except Exception as exc:
+            self.logger.warning("Failed to check disk space: %s", exc)
+            self._free = None
+        return self._free
+
+    def begin(self, estimated_total: int) -> bool:
+        # Fresh measurement for a batch; False when the whole batch is not
+        # expected to fit above the reserve, and the bot then refuses it.
+        with self._lock:
+            self.queries = 0
+            free = self._measure()
+        if free is None:
+            return True
+        if free - estimated_total < self.reserve:
+            self.logger.warning("Batch needs about %d bytes but only %d are free", estimated_total, free)
+            return False
+        return True
+
+    def _stale(self, cost: int) -> bool:
+        if self._free is None or time.monotonic() - self._measured_at >= self.interval:
+            return True
+        return self._free - cost - self.reserve < self.refresh_bytes
+
+    def take(self, nbytes: int) -> bool:
+        cost = -(-max(0, nbytes) // self.BLOCK) * self.BLOCK
+        with self._lock:
+            if self._stale(cost):
+                self._measure()
+            if self._free is None:
+                return True
+            if self._free - cost < self.reserve:
+                return False
+            self._free -= cost
+            return True
+
+
+class DirectoryIndex:
+    # One os.scandir pass over a directory, then name lookups and rename
+    # suffixes are answered from memory. Names are case-folded the way the
+    # platform compares them. Only the highest "(n)" suffix per stem is kept,
+    # so the next free rename is found without probing (1), (2), ...
+    SUFFIXED = re.compile(r'^(?P<stem>.*) \((?P<n>\d+)\)$')
+
+    def __init__(self, directory: Path, logger: logging.Logger):
+        self.directory = directory
+        self.logger = logger
+        self._names: Set[str] = set()
+        self._highest: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return os.path.normcase(name)
+
+    def load(self) -> None:
+        self._names = set()
+        self._highest = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    self.add(entry.name)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            self.logger.warning("Could not index %s: %s", self.directory, exc)
+
+    def add(self, name: str) -> None:
+        key = self._key(name)
+        self._names.add(key)
+        path = Path(key)
+        match = self.SUFFIXED.match(path.stem)
+        if match:
+            slot = (match.group('stem'), path.suffix)
+            n = int(match.group('n'))
+            if n > self._highest.get(slot, 0):
+                self._highest[slot] = n
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._names
+
+    def next_free(self, path: Path) -> Path:
+        key = Path(self._key(path.name))
+        counter = self._highest.get((key.stem, key.suffix), 0) + 1
+        while True:
+            candidate = path.with_stem(f"{path.stem} ({counter})")
+            if candidate.name not in self:
+                return candidate
+            counter += 1
+
+
+class ContentStore:
+    # Content-addressed blobs under <output dir>/.tjm-store/<2 hex>/<digest>.
+    # Each distinct rendering is written once; every post file is a hard link
+    # to its blob, or a copy where the filesystem refuses links. Both are made
+    # under a temp name and renamed over the target, so replacing an old
+    # output never writes through into a blob another post shares.
+    DIRNAME = '.tjm-store'
+
+    def __init__(self, output_dir: Path, logger: logging.Logger):
+        self.root = output_dir / self.DIRNAME
+        self.logger = logger
+        self.links = True
+        self.counts: Dict[str, int] = {}
+        # Blobs compared with their content in this run.
+        self._checked: Set[str] = set()
+        self._guards: Dict[str, threading.Lock] = {}
+        self._verified: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def put(self, digest: str, data: bytes) -> Tuple[Path, bool]:
+        # (blob path, newly written). A blob already on disk is compared with
+        # 'data' the first time a run uses it: an output edited in place
+        # changes its blob too, and relinking it would spread the damage.
+        blob = self.blob_path(digest)
+        with self._lock:
+            checked = digest in self._checked
+            guard = None if checked else self._guards.setdefault(digest, threading.Lock())
+        if checked:
+            self.count('dedup_hits')
+            return blob, False
+        # One thread checks (and if need be writes) a given blob; others
+        # wanting the same digest wait for it.
+        with guard:
+            with self._lock:
+                checked = digest in self._checked
+            if checked or self._intact(blob, data):
+                self.count('dedup_hits')
+                with self._lock:
+                    self._checked.add(digest)
+                return blob, False
+            return blob, self._write_blob(blob, digest, data)
+
+    def _write_blob(self, blob: Path, digest: str, data: bytes) -> bool:
+        if blob.exists():
+            self.logger.warning("Content store blob %s does not match its digest; rewriting it", digest)
+            self.count('dedup_repairs')
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                if f.write(data) != len(data):
+                    raise OSError(f"short write to {tmp.name}")
+            os.replace(tmp, blob)
+        except OSError:
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._checked.add(digest)
+        self.count('dedup_blobs')
+        return True
+
+    @staticmethod
+    def _intact(blob: Path, data: bytes) -> bool:
+        try:
+            if blob.stat().st_size != len(data):
+                return False
+            with open(blob, 'rb') as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def forget(self, digest: str) -> None:
+        # The next put() compares the blob again and rewrites it if damaged.
+        with self._lock:
+            self._checked.discard(digest)
+            self._verified.discard(digest)
+
+    def materialize(self, blob: Path, path: Path) -> bool:
+        # True when 'path' was linked, False when it had to be copied.
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if self.links:
+                try:
+                    os.link(blob, tmp)
+                    os.replace(tmp, path)
+                    self.count('dedup_links')
+                    return True
+                except OSError as exc:
+                    if tmp.exists() or isinstance(exc, FileNotFoundError):
+                        raise
+                    if exc.errno == errno.EMLINK or getattr(exc, 'winerror', None) == 1142:
+                        # This blob hit the filesystem's link limit (1023 on NTFS).
+                        self.count('dedup_link_limit')
+                    else:
+                        # FAT/exFAT, some network shares.
+                        self.links = False
+                        self.logger.warning("Hard links unavailable in %s (%s); copying from the store",
+                                            path.parent, exc)
+            shutil.copyfile(blob, tmp)
+            os.replace(tmp, path)
+            self.count('dedup_copies')
+            return False
+        except OSError:
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            raise
+
+    def verified_link(self, path: Path, digest: str) -> bool:
+        # True when 'path' is the very inode of a blob already read back and
+        # checked in this run, so reading it again would prove nothing new.
+        with self._lock:
+            if digest not in self._verified:
+                return False
+        try:
+            return os.path.samefile(path, self.blob_path(digest))
+        except OSError:
+            return False
+
+    def mark_verified(self, path: Path, digest: str) -> None:
+        try:
+            linked = os.path.samefile(path, self.blob_path(digest))
+        except OSError:
+            return
+        if linked:
+            with self._lock:
+                self._verified.add(digest)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = {}
+            self._checked.clear()
+            self._guards.clear()
+            self._verified.clear()
 
 
 class FileManager:
     INVALID_CHARS = '<>:"/\\|?*'
 
-    def __init__(self, output_dir: Path, conflict: str, logger: logging.Logger):
+    def __init__(self, output_dir: Path, conflict: str, logger: logging.Logger,
+                 hash_algorithm: str = 'sha256', atomic_writes: bool = False,
+                 fsync_batch: int = 0, fsync_interval_ms: float = 0,
+                 disk_reserve: int = 1024 * 1024, disk_check_interval: float = 5.0,
+                 sink: str = 'files', archive_name: str = 'posts', dedup: bool = False):
         self.output_dir = output_dir
         self.conflict = conflict
         self.logger = logger
+        self.atomic_writes = atomic_writes
+        self.committer: Optional[GroupCommit] = (
+            GroupCommit(logger, fsync_batch, fsync_interval_ms)
+            if fsync_batch > 0 or fsync_interval_ms > 0 else None
+        )
+        try:
+            hashlib.new(hash_algorithm)
+            self.hash_algorithm = hash_algorithm
+        except ValueError:
+            self.logger.warning("Unknown hash algorithm %r; using sha256", hash_algorithm)
+            self.hash_algorithm = 'sha256'
+        self.sink: Optional[ArchiveSink] = None
+        if sink in SINKS:
+            sink_class = SINKS[sink]
+            self.sink = sink_class(output_dir / f"{archive_name}.{sink_class.EXTENSION}", logger,
+                                   self.hash_bytes, self.hash_algorithm)
+        elif sink != 'files':
+            self.logger.warning("Unknown output sink %r; writing one file per post", sink)
+        self.space = SpaceBudget(output_dir, logger, reserve=disk_reserve, interval=disk_check_interval)
+        self.store: Optional[ContentStore] = None
+        if dedup and self.sink is not None:
+            self.logger.warning('The content store is not used with archive output')
+        elif dedup:
+            self.store = ContentStore(output_dir, logger)
+        # Outputs of a dedup run may be hard links to shared blobs; writing
+        # one in place would change every linked copy.
+        self.shared_inodes = self.store is not None or (output_dir / ContentStore.DIRNAME).is_dir()
+        if self.shared_inodes and self.sink is None:
+            self.atomic_writes = True
+        if self.sink is not None:
+            self.sink.durable = self.committer is not None
+        # Atomic writes under group commit stay at their temp name until
+        # verified (commit) and then until their batch has been flushed.
+        self.defer_renames = self.atomic_writes and self.committer is not None and self.sink is None
+        self._staged: Dict[Path, Path] = {}
+        self._claimed: Set[Path] = set()
+        self._claim_lock = threading.Lock()
+        self._index: Optional[DirectoryIndex] = None
+        self.conflict_outcomes: Dict[str, int] = {}
+
+    def reset_claims(self, keep_index: bool = False) -> None:
+        # Also drops the directory index so the next resolve re-scans what
+        # other runs may have written since, unless the caller has held the
+        # run lock throughout (watch mode).
+        with self._claim_lock:
+            self._claimed.clear()
+            if not keep_index:
+                self._index = None
+            self.conflict_outcomes = {}
+        if self.store is not None:
+            self.store.reset()
+
+    def _directory_index(self) -> DirectoryIndex:
+        if self._index is None:
+            self._index = DirectoryIndex(self.output_dir, self.logger)
+            # A run's archive starts empty, so only names handed out in this
+            # run can clash.
+            if self.sink is None:
+                self._index.load()
+        return self._index
 
     def ensure_output_dir(self) -> bool:
         try:
             self.output_dir.mkdir(parents=True, exist_ok=True)
             return os.access(self.output_dir, os.W_OK)
         except Exception as exc:
-            self.logger.error(f"Cannot create/access output directory {self.output_dir}: {exc}")
+            self.logger.error("Cannot create/access output directory %s: %s", self.output_dir, exc)
             return False
 
     def has_enough_space(self, estimated_bytes: int = 1024) -> bool:
@@ -27,9 +460,12 @@ class FileManager:
             total, used, free = shutil.disk_usage(self.output_dir)
             return free > max(estimated_bytes, 1024 * 1024)
         except Exception as exc:
-            self.logger.warning(f"Failed to check disk space: {exc}")
+            self.logger.warning("Failed to check disk space: %s", exc)
             return True
 
+    def reserve_space(self, nbytes: int) -> bool:
+        return self.space.take(nbytes)
+
     def sanitize_filename(self, name: str, extension: str) -> str:
         base = ''.join('_' if c in self.INVALID_CHARS else c for c in name).strip()
         if not base:
@@ -38,34 +474,184 @@ class FileManager:
         return f"{base}.{extension.strip('.')}"
 
     def resolve_conflict(self, filepath: Path) -> Optional[Path]:
-        if not filepath.exists():
-            return filepath
+        # Targets handed out earlier in the run count as taken even if the
+        # (possibly concurrent) write has not landed on disk yet.
+        with self._claim_lock:
+            target, outcome = self._resolve_unclaimed(filepath)
+            self.conflict_outcomes[outcome] = self.conflict_outcomes.get(outcome, 0) + 1
+            if target is not None:
+                self._claimed.add(target)
+                if target.parent == self.output_dir:
+                    self._directory_index().add(target.name)
+            return target
+
+    def _is_taken(self, path: Path) -> bool:
+        if path in self._claimed:
+            return True
+        if path.parent == self.output_dir:
+            return path.name in self._directory_index()
+        return path.exists()
+
+    def _resolve_unclaimed(self, filepath: Path) -> Tuple[Optional[Path], str]:
+        if not self._is_taken(filepath):
+            return filepath, 'new'
         if self.conflict == 'skip':
-            self.logger.info(f"File exists; skipping: {filepath.name}")
-            return None
+            self.logger.info("File exists; skipping: %s", filepath.name)
+            return None, 'skip'
         if self.conflict == 'overwrite':
-            return filepath
+            return filepath, 'overwrite'
+        if filepath.parent == self.output_dir:
+            return self._directory_index().next_free(filepath), 'rename'
         counter = 1
         while True:
             candidate = filepath.with_stem(f"{filepath.stem} ({counter})")
-            if not candidate.exists():
-                return candidate
+            if not self._is_taken(candidate):
+                return candidate, 'rename'
             counter += 1
 
+    @staticmethod
+    def encode_text(content: str) -> bytes:
+        # Same bytes a text-mode write would produce on this platform.
+        if os.linesep != '\n':
+            content = content.replace('\n', os.linesep)
+        return content.encode('utf-8', errors='replace')
+
     def write_text(self, path: Path, content: str) -> bool:
+        return self.write_bytes(path, self.encode_text(content))
+
+    def write_bytes(self, path: Path, data: bytes, digest: Optional[str] = None) -> bool:
+        # Atomic mode writes a sibling temp file and renames it over the
+        # target, so readers and crashes never observe a truncated file.
+        # With deferred renames the temp file is left staged for commit().
+        if self.sink is not None:
+            return self.sink.add(path.name, data)
+        if self.store is not None:
+            return self._write_deduped(path, data, digest or self.hash_bytes(data))
+        tmp = self._temp_name(path) if self.atomic_writes else path
         try:
-            with open(path, 'w', encoding='utf-8', errors='replace') as f:
-                f.write(content)
-            return True
+            with open(tmp, 'wb') as f:
+                written = f.write(data)
+            if written != len(data):
+                self.logger.error("Short write to %s: %d/%d bytes", path, written, len(data))
+                self._discard_tmp(tmp, path)
+                return False
+            if self.defer_renames:
+                self._stage(path, tmp)
+                return True
+            if tmp != path:
+                os.replace(tmp, path)
+            self._indexed(path)
         except PermissionError as exc:
-            self.logger.error(f"Permission denied writing {path}: {exc}")
+            self.logger.error("Permission denied writing %s: %s", path, exc)
+            self._discard_tmp(tmp, path)
             return False
         except OSError as exc:
-            self.logger.error(f"Disk/IO error writing {path}: {exc}")
+            self.logger.error("Disk/IO error writing %s: %s", path, exc)
+            self._discard_tmp(tmp, path)
             return False
+        if self.committer is not None:
+            return self.committer.add(path)
+        return True
+
+    def _write_deduped(self, path: Path, data: bytes, digest: str) -> bool:
+        target = self._temp_name(path) if self.defer_renames else path
+        try:
+            blob, created = self.store.put(digest, data)
+            if self.store.materialize(blob, target) and not created:
+                self.store.count('dedup_bytes_saved', len(data))
+        except OSError as exc:
+            self.logger.error("Disk/IO error writing %s via the content store: %s", path, exc)
+            self._discard_tmp(target, path)
+            return False
+        if created and self.committer is not None and not self.committer.add(blob):
+            self._discard_tmp(target, path)
+            return False
+        if self.defer_renames:
+            self._stage(path, target)
+            return True
+        self._indexed(path)
+        if self.committer is not None:
+            return self.committer.add(path)
+        return True
+
+    @staticmethod
+    def _temp_name(path: Path) -> Path:
+        return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _stage(self, path: Path, tmp: Path) -> None:
+        with self._claim_lock:
+            self._staged[path] = tmp
+        self._indexed(path)
+
+    def staged_path(self, path: Path) -> Path:
+        # Where the bytes written for 'path' can be read back before commit().
+        with self._claim_lock:
+            return self._staged.get(path, path)
+
+    def commit(self, path: Path) -> bool:
+        # Hands a verified staged write to group commit, which moves it into
+        # place once its data is on disk. No-op for writes already in place.
+        with self._claim_lock:
+            staged = self._staged.pop(path, None)
+        if staged is None:
+            return True
+        return self.committer.add(path, staged)
+
+    def discard(self, path: Path) -> None:
+        with self._claim_lock:
+            staged = self._staged.pop(path, None)
+        if staged is not None:
+            self._discard_tmp(staged, path)
+
+    def detach(self, path: Path) -> None:
+        # Removes 'path' if it shares its inode with other files, so an editor
+        # saving over it starts a new file instead of writing into a blob.
+        try:
+            if path.stat().st_nlink > 1:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            self.logger.warning("Could not detach %s from the content store: %s", path.name, exc)
+
+    def _indexed(self, path: Path) -> None:
+        with self._claim_lock:
+            if self._index is not None and path.parent == self.output_dir:
+                self._index.add(path.name)
+
+    @staticmethod
+    def _discard_tmp(tmp: Path, path: Path) -> None:
+        if tmp != path:
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def open_sink(self) -> bool:
+        return self.sink is None or self.sink.open()
+
+    def flush(self) -> bool:
+        ok = True
+        with self._claim_lock:
+            leftover, self._staged = self._staged, {}
+        if leftover:
+            # Written but never verified (aborted run); never moved into place.
+            self.logger.warning("Discarding %d unverified staged files", len(leftover))
+            for path, staged in leftover.items():
+                self._discard_tmp(staged, path)
+        if self.sink is not None:
+            ok = self.sink.close()
+            if ok and self.committer is not None:
+                self.committer.add(self.sink.path)
+        if self.committer is None:
+            return ok
+        return self.committer.flush() and ok
 
     @staticmethod
     def sha256_of_text(text: str) -> str:
         return hashlib.sha256(text.encode('utf-8', errors='replace')).hexdigest()
 
+    def hash_bytes(self, data: bytes) -> str:
+        return hashlib.new(self.hash_algorithm, data).hexdigest()
+
 
@@ -1,103 +1,211 @@
 import os
-import time
-import subprocess
 import logging
 from pathlib import Path
-import pyautogui
-import pygetwindow as gw
+from typing import List, Optional
 
-from .clipboard import ClipboardManager
-from .waiter import Waiter
+from .clipboard import ClipboardManager, fingerprint, normalize_newlines, split_chunks
+from .gui_backends import GuiBackend, PyAutoGuiBackend
+from .timing import AdaptiveTimer
 
 
 class GuiController:
-    def __init__(self, logger: logging.Logger, typing_interval: float, waits):
+    def __init__(self, logger: logging.Logger, typing_interval: float, waits,
+                 backend: Optional[GuiBackend] = None, paste_chunk_size: int = 16384,
+                 paste_repairs: int = 3):
         self.logger = logger
         self.typing_interval = typing_interval
+        self.paste_chunk_size = max(0, int(paste_chunk_size))
+        self.paste_repairs = max(0, int(paste_repairs))
+        self.typed_chunks = 0
         self.waits = waits
         self.notepad_win = None
-        pyautogui.FAILSAFE = True
-        pyautogui.PAUSE = 0.1
+        self.backend = backend if backend is not None else PyAutoGuiBackend(failsafe=True, pause=0.1)
+        self.timer = AdaptiveTimer(logger, margin=waits.get('timing_margin', 1.5),
+                                   floor=waits.get('timing_floor', 0.02))
+
+    def _tune_pause(self) -> None:
+        # The backend sleeps PAUSE after every input call; keep it in step
+        # with what the UI has been observed to need.
+        self.backend.set_pause(self.timer.delay('keystroke', 0.1))
+
+    def _window_present(self, fragment: str) -> bool:
+        fragment = fragment.lower()
+        return any(fragment in title.lower() for title in self.backend.window_titles())
+
+    def _is_active(self) -> bool:
+        return self.notepad_win is not None and self.backend.is_active(self.notepad_win)
+
+    def _activate(self) -> None:
+        if not self._is_active():
+            self.backend.activate(self.notepad_win)
+            self.timer.wait_for('activate', self._is_active, self.waits.get('window', 5))
+
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
 
     def launch_or_focus_notepad(self) -> bool:
         try:
-            windows = gw.getWindowsWithTitle('Notepad')
+            windows = self.backend.find_windows('Notepad')
             if windows:
                 self.notepad_win = windows[0]
             else:
-                subprocess.Popen(['notepad.exe'])
-                ok = Waiter.wait_for(lambda: len(gw.getWindowsWithTitle('Notepad')) > 0, self.waits.get('window', 5))
+                self.backend.launch_notepad()
+                ok = self.timer.wait_for('window', lambda: len(self.backend.find_windows('Notepad')) > 0,
+                                         self.waits.get('window', 5))
                 if not ok:
                     self.logger.error('Notepad window did not appear')
                     return False
-                self.notepad_win = gw.getWindowsWithTitle('Notepad')[0]
-            self.notepad_win.activate()
-            time.sleep(0.3)
+                self.notepad_win = self.backend.find_windows('Notepad')[0]
+            self.backend.activate(self.notepad_win)
+            if not self.timer.wait_for('activate', self._is_active, self.waits.get('window', 5)):
+                self.logger.warning('Notepad did not report focus; continuing')
             return True
         except Exception as exc:
-            self.logger.error(f"Failed to launch/focus Notepad: {exc}")
+            self.logger.error("Failed to launch/focus Notepad: %s", exc)
             return False
 
+    def _paste_chunks(self, chunks: List[str], clipboard: ClipboardManager) -> None:
+        # No per-chunk read back or settle: _first_bad_chunk checks the whole
+        # buffer afterwards and repairs any chunk that did not land. One
+        # settle lets the last paste finish before that check's copy.
+        pasted = False
+        for chunk in chunks:
+            if clipboard.set_text(chunk):
+                self.backend.hotkey('ctrl', 'v')
+                pasted = True
+            else:
+                self._type_chunk(chunk)
+        if pasted:
+            self.timer.settle('paste', 0.1)
+
+    def _type_chunk(self, chunk: str) -> None:
+        self.typed_chunks += 1
+        self.backend.write(chunk, interval=self.typing_interval)
+
+    def _first_bad_chunk(self, chunks: List[str], clipboard: ClipboardManager) -> Optional[int]:
+        # One copy of the editor buffer per attempt (Notepad exposes it no
+        # other way), compared by length and CRC rather than character by
+        # character. On a mismatch the same check walks the chunks to find
+        # the first one that did not arrive intact.
+        expected = [normalize_newlines(chunk) for chunk in chunks]
+        clipboard.set_text('')
+        self.backend.hotkey('ctrl', 'a')
+        self.backend.hotkey('ctrl', 'c')
+        self.timer.settle('keystroke', 0.05)
+        entered = normalize_newlines(clipboard.get_text())
+        if fingerprint(entered) == fingerprint(''.join(expected)):
+            return None
+        offset = 0
+        for idx, chunk in enumerate(expected):
+            if fingerprint(entered[offset:offset + len(chunk)]) != fingerprint(chunk):
+                return idx
+            offset += len(chunk)
+        # Every chunk arrived but something trails them.
+        return len(chunks) - 1
+
     def replace_editor_text(self, text: str, clipboard: ClipboardManager) -> bool:
+        # Pastes in bounded chunks; a chunk that fails verification is the
+        # only thing typed, so input time does not grow with a bad paste.
         try:
-            pyautogui.hotkey('ctrl', 'a')
-            time.sleep(0.05)
-            pyautogui.press('delete')
-            time.sleep(0.05)
-            if clipboard.set_text(text):
-                pyautogui.hotkey('ctrl', 'v')
-                time.sleep(0.1)
-                pyautogui.hotkey('ctrl', 'home')
-                pyautogui.hotkey('ctrl', 'shift', 'end')
-                pyautogui.hotkey('ctrl', 'c')
-                time.sleep(0.05)
-                pasted = clipboard.get_text()
-                if pasted and pasted[:64] == text[:64]:
+            self._tune_pause()
+            chunks = split_chunks(text, self.paste_chunk_size)
+            self.backend.hotkey('ctrl', 'a')
+            self.timer.settle('keystroke', 0.05)
+            self.backend.press('delete')
+            self.timer.settle('keystroke', 0.05)
+            self._paste_chunks(chunks, clipboard)
+            for attempt in range(self.paste_repairs + 1):
+                bad = self._first_bad_chunk(chunks, clipboard)
+                if bad is None:
                     return True
-                self.logger.warning('Clipboard paste verification weak; falling back to typing')
-            pyautogui.write(text, interval=self.typing_interval)
-            return True
+                if attempt == self.paste_repairs:
+                    break
+                self.logger.warning("Paste verification failed at chunk %d/%d; typing that chunk",
+                                    bad + 1, len(chunks))
+                # Everything before the bad chunk verified; it goes back in as
+                # the same bounded chunks, so a failed paste there types at
+                # most one chunk.
+                self.backend.press('delete')
+                self.timer.settle('keystroke', 0.05)
+                self._paste_chunks(chunks[:bad], clipboard)
+                self._type_chunk(chunks[bad])
+                self._paste_chunks(chunks[bad + 1:], clipboard)
+            self.logger.error("Editor text still differs after %d repair(s)", self.paste_repairs)
+            return False
         except Exception as exc:
-            self.logger.error(f"Failed to input text: {exc}")
+            self.logger.error("Failed to input text: %s", exc)
             return False
 
     def save_via_ui(self, directory: Path, filename: str) -> bool:
         try:
-            self.notepad_win.activate()
-            time.sleep(0.2)
-            pyautogui.hotkey('ctrl', 'shift', 's')
-            ok = Waiter.wait_for(lambda: True, self.waits.get('save_dialog', 1.0))
+            self._tune_pause()
+            target = directory / filename
+            before = self._mtime(target)
+            self._activate()
+            self.backend.hotkey('ctrl', 'shift', 's')
+            ok = self.timer.wait_for('save_dialog', lambda: self._window_present('save as'),
+                                     self.waits.get('save_dialog', 1.0))
             if not ok:
                 self.logger.warning('Save dialog wait elapsed; proceeding')
-            pyautogui.write(str(directory))
-            pyautogui.press('enter')
-            time.sleep(0.2)
-            pyautogui.write(filename)
-            pyautogui.press('enter')
-            time.sleep(0.5)
-            pyautogui.hotkey('alt', 'y')
-            time.sleep(0.2)
-            pyautogui.press('enter')
+            self.backend.write(str(directory))
+            self.backend.press('enter')
+            self.timer.settle('navigate', 0.2)
+            self.backend.write(filename)
+            self.backend.press('enter')
+
+            def saved_or_confirming() -> bool:
+                return self._mtime(target) != before or self._window_present('confirm save as')
+
+            if not self.timer.wait_for('file_saved', saved_or_confirming, self.waits.get('file', 5.0)):
+                # Nothing observable happened; fall back to the blind sequence.
+                self.backend.hotkey('alt', 'y')
+                self.timer.settle('dialog', 0.2)
+                self.backend.press('enter')
+                return True
+            if self._window_present('confirm save as'):
+                self.backend.hotkey('alt', 'y')
+                if not self.timer.wait_for('confirm', lambda: self._mtime(target) != before,
+                                           self.waits.get('file', 5.0)):
+                    self.logger.warning("Overwrite confirmation did not produce %s", filename)
             return True
         except Exception as exc:
-            self.logger.error(f"Save via UI failed: {exc}")
+            self.logger.error("Save via UI failed: %s", exc)
             return False
 
+    def wait_ready(self) -> bool:
+        # Between posts: the save dialogs have closed and the editor has focus
+        # again, so the next Ctrl+A lands in Notepad.
+        def ready() -> bool:
+            return not self._window_present('save as') and self._is_active()
+
+        if self.notepad_win is None or self.timer.wait_for('ready', ready, self.waits.get('window', 5)):
+            return True
+        self.logger.warning('Notepad not ready for the next post; refocusing')
+        self._activate()
+        return self._is_active()
+
     def handle_unexpected_dialogs(self) -> None:
         try:
-            pyautogui.press('esc')
-            time.sleep(0.1)
-            pyautogui.press('enter')
+            self.backend.press('esc')
+            self.timer.settle('dialog', 0.1)
+            self.backend.press('enter')
         except Exception:
             pass
 
     def close_notepad(self) -> None:
         try:
             if self.notepad_win:
-                self.notepad_win.close()
-                time.sleep(0.2)
-                self.handle_unexpected_dialogs()
+                self.backend.close(self.notepad_win)
+                win = self.notepad_win
+                gone = self.timer.wait_for('close', lambda: win not in self.backend.find_windows('Notepad'),
+                                           self.waits.get('close', 1.0))
+                if not gone:
+                    self.handle_unexpected_dialogs()
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("UI latency percentiles: %s", self.timer.summary())
         except Exception:
             pass
-
-
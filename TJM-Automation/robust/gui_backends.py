@@ -0,0 +1,367 @@
+import os
+import time
+import random
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class GuiBackend:
+    # Everything GuiController needs from the desktop. Window handles are
+    # opaque to the controller and only passed back to the backend.
+    def supported(self) -> bool:
+        raise NotImplementedError
+
+    def launch_notepad(self) -> None:
+        raise NotImplementedError
+
+    def find_windows(self, title: str) -> List:
+        raise NotImplementedError
+
+    def window_titles(self) -> List[str]:
+        raise NotImplementedError
+
+    def activate(self, win) -> None:
+        raise NotImplementedError
+
+    def is_active(self, win) -> bool:
+        raise NotImplementedError
+
+    def close(self, win) -> None:
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        raise NotImplementedError
+
+    def write(self, text: str, interval: float = 0.0) -> None:
+        raise NotImplementedError
+
+    def set_pause(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def set_clipboard(self, text: str) -> None:
+        raise NotImplementedError
+
+    def get_clipboard(self) -> str:
+        raise NotImplementedError
+
+
+class PyAutoGuiBackend(GuiBackend):
+    # pyautogui, pygetwindow and pyperclip (and the display libraries they
+    # pull in) are imported on first use, so runs that never take the GUI
+    # path do not pay for loading them.
+    def __init__(self, failsafe: bool = True, pause: float = 0.1):
+        self._failsafe = failsafe
+        self._pause = pause
+        self._modules = None
+
+    def _load(self):
+        if self._modules is None:
+            import pyautogui
+            import pygetwindow
+            import pyperclip
+            pyautogui.FAILSAFE = self._failsafe
+            pyautogui.PAUSE = self._pause
+            self._modules = (pyautogui, pygetwindow, pyperclip)
+        return self._modules
+
+    @property
+    def _pyautogui(self):
+        return self._load()[0]
+
+    @property
+    def _gw(self):
+        return self._load()[1]
+
+    @property
+    def _pyperclip(self):
+        return self._load()[2]
+
+    def supported(self) -> bool:
+        return os.name == 'nt'
+
+    def launch_notepad(self) -> None:
+        self._load()
+        subprocess.Popen(['notepad.exe'])
+
+    def find_windows(self, title: str) -> List:
+        return self._gw.getWindowsWithTitle(title)
+
+    def window_titles(self) -> List[str]:
+        return self._gw.getAllTitles()
+
+    def activate(self, win) -> None:
+        win.activate()
+
+    def is_active(self, win) -> bool:
+        return bool(win.isActive)
+
+    def close(self, win) -> None:
+        win.close()
+
+    def hotkey(self, *keys: str) -> None:
+        self._pyautogui.hotkey(*keys)
+
+    def press(self, key: str) -> None:
+        self._pyautogui.press(key)
+
+    def write(self, text: str, interval: float = 0.0) -> None:
+        self._pyautogui.write(text, interval=interval)
+
+    def set_pause(self, seconds: float) -> None:
+        self._pause = seconds
+        if self._modules is not None:
+            self._pyautogui.PAUSE = seconds
+
+    def set_clipboard(self, text: str) -> None:
+        self._pyperclip.copy(text)
+
+    def get_clipboard(self) -> str:
+        return self._pyperclip.paste()
+
+
+class HeadlessBackend(GuiBackend):
+    # No desktop at all: supported() is False, so the bot always writes
+    # files directly. Used by sharded worker processes.
+    def __init__(self):
+        self.clipboard = ''
+
+    def supported(self) -> bool:
+        return False
+
+    def launch_notepad(self) -> None:
+        pass
+
+    def find_windows(self, title: str) -> List:
+        return []
+
+    def window_titles(self) -> List[str]:
+        return []
+
+    def activate(self, win) -> None:
+        pass
+
+    def is_active(self, win) -> bool:
+        return False
+
+    def close(self, win) -> None:
+        pass
+
+    def hotkey(self, *keys: str) -> None:
+        pass
+
+    def press(self, key: str) -> None:
+        pass
+
+    def write(self, text: str, interval: float = 0.0) -> None:
+        pass
+
+    def set_pause(self, seconds: float) -> None:
+        pass
+
+    def set_clipboard(self, text: str) -> None:
+        self.clipboard = text
+
+    def get_clipboard(self) -> str:
+        return self.clipboard
+
+
+class FakeWindow:
+    def __init__(self, title: str):
+        self.title = title
+
+
+class FakeNotepadBackend(GuiBackend):
+    # Deterministic in-memory Notepad: an editor buffer, a clipboard, the Save
+    # As / Confirm Save As dialogs and real files written to disk. Events
+    # complete asynchronously after their configured latency (plus optional
+    # seeded jitter), so waits and timeouts behave as they would on a desktop.
+    DEFAULT_LATENCIES = {
+        'launch': 0.05,
+        'activate': 0.0,
+        'dialog': 0.02,
+        'save': 0.01,
+        'close': 0.01,
+        'keystroke': 0.0,
+        'char': 0.0,
+    }
+
+    def __init__(self, latencies: Optional[Dict[str, float]] = None, jitter: float = 0.0, seed: int = 0):
+        self.latencies = dict(self.DEFAULT_LATENCIES)
+        self.latencies.update(latencies or {})
+        self.jitter = max(0.0, jitter)
+        self._random = random.Random(seed)
+        self.window: Optional[FakeWindow] = None
+        self.active = False
+        self.text = ''
+        self.selected = False
+        self.dirty = False
+        self.clipboard = ''
+        self.pause = 0.0
+        self.saved_files: List[Path] = []
+        self._dialog: Optional[str] = None
+        self._field = ''
+        self._cwd: Optional[Path] = None
+        self._pending_path: Optional[Path] = None
+        self._lock = threading.RLock()
+
+    def _delay(self, name: str) -> float:
+        base = self.latencies.get(name, 0.0)
+        return base + (self._random.uniform(0, base * self.jitter) if base and self.jitter else 0.0)
+
+    def _schedule(self, name: str, action) -> None:
+        delay = self._delay(name)
+        if not delay:
+            action()
+            return
+
+        def fire():
+            with self._lock:
+                action()
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        timer.start()
+
+    def _input(self) -> None:
+        key_latency = self._delay('keystroke')
+        if key_latency:
+            time.sleep(key_latency)
+        if self.pause:
+            time.sleep(self.pause)
+
+    def _editor_focused(self) -> bool:
+        return self.window is not None and self.active and self._dialog is None
+
+    def _open_window(self) -> None:
+        self.window = FakeWindow('Untitled - Notepad')
+        self.text = ''
+        self.dirty = False
+
+    def _insert(self, text: str) -> None:
+        self.text = text if self.selected else self.text + text
+        self.selected = False
+        self.dirty = True
+
+    def _save_to(self, path: Path) -> None:
+        def commit():
+            with open(path, 'w', encoding='utf-8', errors='replace') as f:
+                f.write(self.text)
+            self.saved_files.append(path)
+            self.dirty = False
+            if self.window is not None:
+                self.window.title = f"{path.name} - Notepad"
+        self._dialog = None
+        self._field = ''
+        self._schedule('save', commit)
+
+    def supported(self) -> bool:
+        return True
+
+    def launch_notepad(self) -> None:
+        self._schedule('launch', self._open_window)
+
+    def find_windows(self, title: str) -> List:
+        if self.window is not None and title in self.window.title:
+            return [self.window]
+        return []
+
+    def window_titles(self) -> List[str]:
+        titles = [self.window.title] if self.window is not None else []
+        if self._dialog == 'save':
+            titles.append('Save As')
+        elif self._dialog == 'confirm':
+            titles.append('Confirm Save As')
+        return titles
+
+    def activate(self, win) -> None:
+        def focus():
+            self.active = win is self.window
+        self._schedule('activate', focus)
+
+    def is_active(self, win) -> bool:
+        return self.active and win is self.window
+
+    def close(self, win) -> None:
+        def shut():
+            if win is self.window and not self.dirty:
+                self.window = None
+                self.active = False
+        self._schedule('close', shut)
+
+    def hotkey(self, *keys: str) -> None:
+        self._input()
+        with self._lock:
+            self._on_hotkey(tuple(k.lower() for k in keys))
+
+    def _on_hotkey(self, combo) -> None:
+        if combo == ('ctrl', 'shift', 's') and self.window is not None:
+            def show():
+                self._dialog = 'save'
+                self._field = ''
+                self._cwd = None
+            self._schedule('dialog', show)
+        elif combo == ('alt', 'y') and self._dialog == 'confirm' and self._pending_path is not None:
+            self._save_to(self._pending_path)
+        elif not self._editor_focused():
+            return
+        elif combo in (('ctrl', 'a'), ('ctrl', 'shift', 'end')):
+            self.selected = True
+        elif combo == ('ctrl', 'home'):
+            self.selected = False
+        elif combo == ('ctrl', 'c'):
+            if self.selected:
+                self.clipboard = self.text
+        elif combo == ('ctrl', 'v'):
+            self._insert(self.clipboard)
+
+    def press(self, key: str) -> None:
+        self._input()
+        with self._lock:
+            self._on_press(key.lower())
+
+    def _on_press(self, key: str) -> None:
+        if self._dialog == 'save' and key == 'enter':
+            entered = Path(self._field)
+            if not entered.is_absolute() and self._cwd is not None:
+                entered = self._cwd / entered
+            self._field = ''
+            if entered.is_dir():
+                self._cwd = entered
+            elif entered.exists():
+                self._pending_path = entered
+                self._schedule('dialog', lambda: setattr(self, '_dialog', 'confirm'))
+            else:
+                self._save_to(entered)
+        elif self._dialog is not None and key == 'esc':
+            self._dialog = None
+        elif self._editor_focused():
+            if key in ('delete', 'backspace') and self.selected:
+                self.text = ''
+                self.selected = False
+                self.dirty = True
+            elif key == 'enter':
+                self._insert('\n')
+
+    def write(self, text: str, interval: float = 0.0) -> None:
+        self._input()
+        per_char = interval + self.latencies.get('char', 0.0)
+        if per_char:
+            time.sleep(per_char * len(text))
+        with self._lock:
+            if self._dialog == 'save':
+                self._field += text
+            elif self._editor_focused():
+                self._insert(text)
+
+    def set_pause(self, seconds: float) -> None:
+        self.pause = max(0.0, seconds)
+
+    def set_clipboard(self, text: str) -> None:
+        self.clipboard = text
+
+    def get_clipboard(self) -> str:
+        return self.clipboard
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+
+class ResponseCache:
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, cache_dir: Path, logger: logging.Logger, ttl: float = 0.0,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.logger = logger
+        self.ttl = max(0.0, float(ttl))
+        self.max_bytes = max(0, int(max_bytes))
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def body_path(self, entry: Dict) -> Path:
+        return self.cache_dir / f"{entry['key']}.body"
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        key = self._key(url)
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            self.logger.warning("Ignoring unreadable cache entry for %s: %s", url, exc)
+            return None
+        if not isinstance(entry, dict) or entry.get('url') != url or not self.body_path(entry).exists():
+            return None
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return self.ttl > 0 and time.time() - float(entry.get('stored_at', 0)) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _write_meta(self, entry: Dict) -> None:
+        meta = self._meta_path(entry['key'])
+        tmp = meta.with_name(meta.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, meta)
+
+    def store(self, url: str, response: requests.Response) -> Optional[Dict]:
+        key = self._key(url)
+        entry = {
+            'key': key,
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': response.encoding,
+            'stored_at': time.time(),
+            'size': 0,
+        }
+        body = self.body_path(entry)
+        tmp = body.with_name(body.name + '.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        entry['size'] += len(chunk)
+            os.replace(tmp, body)
+            self._write_meta(entry)
+        except (OSError, requests.exceptions.RequestException) as exc:
+            self.logger.warning("Failed to cache response for %s: %s", url, exc)
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+            return None
+        self._evict(keep=key)
+        return entry
+
+    def refresh(self, entry: Dict, response: requests.Response) -> Dict:
+        # A 304 may carry updated validators; the cached body stays as is.
+        entry['stored_at'] = time.time()
+        entry['etag'] = response.headers.get('ETag', entry.get('etag'))
+        entry['last_modified'] = response.headers.get('Last-Modified', entry.get('last_modified'))
+        try:
+            self._write_meta(entry)
+        except OSError as exc:
+            self.logger.warning("Failed to refresh cache entry for %s: %s", entry.get('url'), exc)
+        return entry
+
+    def _evict(self, keep: str) -> None:
+        if not self.max_bytes:
+            return
+        entries = []
+        total = 0
+        for meta in self.cache_dir.glob('*.json'):
+            try:
+                with open(meta, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                size = int(entry.get('size', 0))
+            except (OSError, ValueError, AttributeError):
+                continue
+            total += size
+            entries.append((float(entry.get('stored_at', 0)), entry.get('key', meta.stem), size))
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                self._meta_path(key).unlink(missing_ok=True)
+                (self.cache_dir / f"{key}.body").unlink(missing_ok=True)
+                total -= size
+            except OSError as exc:
+                self.logger.warning("Failed to evict cache entry %s: %s", key, exc)
@@ -0,0 +1,83 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Optional
+
+
+class JsonArrayStream:
+    # Decodes a top-level JSON array element by element. Only the text of the
+    # element being decoded is buffered, so callers can stop at any point.
+    WHITESPACE = ' \t\r\n'
+    DELIMITERS = WHITESPACE + ',]'
+
+    def __init__(self, chunks: Iterable[bytes], encoding: Optional[str] = None):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8-sig')(errors='replace')
+        self._json = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buf = self._buf[self._pos:] + text
+                self._pos = 0
+                return True
+        self._buf = self._buf[self._pos:] + self._decoder.decode(b'', final=True)
+        self._pos = 0
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in self.WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found[:1]!r}")
+        self._pos += 1
+
+    def _decode_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A scalar cut at a chunk boundary ("12" of "1234", "-3.5" of
+            # "-3.5e10") still decodes; only accept it once a delimiter follows.
+            truncated = end >= len(self._buf) or (
+                not isinstance(value, (dict, list, str)) and self._buf[end] not in self.DELIMITERS
+            )
+            if truncated and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            sep = self._peek()
+            if sep == ']':
+                self._pos += 1
+                return
+            if sep != ',':
+                raise ValueError(f"Malformed JSON array: unexpected {sep[:1]!r}")
+            self._pos += 1
@@ -0,0 +1,99 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Longest Retry-After honoured; anything above is treated as this.
+MAX_RETRY_AFTER = 300.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Seconds, or an HTTP date; None when absent or unreadable.
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(MAX_RETRY_AFTER, max(0.0, seconds))
+
+
+class AdaptiveLimiter:
+    # AIMD cap on requests in flight. Every request that comes back in about
+    # the usual time adds 1/limit, roughly +1 per round of requests. A 429 or
+    # 503, a 5xx, a connection error or a latency well above the fastest seen
+    # lately cuts the limit by 'decrease', at most once per round trip so a
+    # burst of bad responses counts once. Retry-After holds back every new
+    # request until it has passed.
+    def __init__(self, maximum: int, initial: Optional[int] = None, minimum: int = 1,
+                 decrease: float = 0.5, tolerance: float = 2.0, slack: float = 0.05,
+                 adaptive: bool = True):
+        self.maximum = max(1, int(maximum))
+        self.minimum = max(1, min(int(minimum), self.maximum))
+        start = initial if initial is not None else max(self.minimum, self.maximum // 2)
+        self.limit = float(max(self.minimum, min(self.maximum, start)) if adaptive else self.maximum)
+        self.decrease = decrease
+        self.tolerance = tolerance
+        # Latency below baseline + slack never counts as congestion, so
+        # sub-millisecond jitter on fast links does not cut the limit.
+        self.slack = slack
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.throttled = 0
+        self._baseline: Optional[float] = None
+        self._last_cut = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(wait if wait > 0 else None)
+            self.in_flight += 1
+
+    def release(self, latency: float, congested: bool = False, throttled: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if throttled:
+                self.throttled += 1
+            if self.adaptive:
+                if congested or throttled:
+                    self._cut(now, latency)
+                else:
+                    self._observe(now, latency)
+            self._cond.notify_all()
+
+    def _observe(self, now: float, latency: float) -> None:
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            # Drifts up slowly so a server that is simply slower now stops
+            # looking congested.
+            self._baseline += (latency - self._baseline) * 0.01
+        if latency > max(self._baseline * self.tolerance, self._baseline + self.slack):
+            self._cut(now, latency)
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+    def _cut(self, now: float, latency: float) -> None:
+        if now - self._last_cut < latency:
+            return
+        self._last_cut = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease)
+
+    def take_throttled(self) -> int:
+        # Throttled responses since the last call.
+        with self._cond:
+            count, self.throttled = self.throttled, 0
+            return count
@@ -1,33 +1,84 @@
 import os
 import logging
 from pathlib import Path
+from typing import Optional
+
+
+def pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows; ask the
+        # kernel for its exit code instead.
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
 
 
 class InstanceLock:
-    def __init__(self, lockfile: Path, logger: logging.Logger):
+    def __init__(self, lockfile: Path, logger: logging.Logger, reclaim_stale: bool = False):
         self.lockfile = lockfile
         self.logger = logger
+        self.reclaim_stale = reclaim_stale
         self._acquired = False
 
+    def _owner(self) -> Optional[int]:
+        try:
+            pid_text = self.lockfile.read_text(encoding='utf-8', errors='ignore').strip()
+            return int(pid_text) if pid_text.isdigit() else None
+        except Exception:
+            return None
+
+    def _create(self) -> None:
+        fd = os.open(self.lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        with os.fdopen(fd, 'w', encoding='utf-8', errors='ignore') as f:
+            f.write(str(os.getpid()))
+
     def acquire(self) -> bool:
         try:
             self.lockfile.parent.mkdir(parents=True, exist_ok=True)
-            fd = os.open(self.lockfile, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-            with os.fdopen(fd, 'w', encoding='utf-8', errors='ignore') as f:
-                f.write(str(os.getpid()))
+            try:
+                self._create()
+            except FileExistsError:
+                existing_pid = self._owner()
+                if not self.reclaim_stale or existing_pid is None or pid_alive(existing_pid):
+                    raise
+                # The owner is gone. Re-read just before unlinking so a lease
+                # another process reclaimed in the meantime is left alone.
+                if self._owner() != existing_pid:
+                    raise
+                self.logger.warning("Reclaiming stale lock %s from dead pid %s", self.lockfile.name, existing_pid)
+                self.lockfile.unlink(missing_ok=True)
+                self._create()
             self._acquired = True
-            self.logger.info(f"Acquired instance lock at {self.lockfile}")
+            self.logger.info("Acquired instance lock at %s", self.lockfile)
             return True
         except FileExistsError:
-            try:
-                pid_text = self.lockfile.read_text(encoding='utf-8', errors='ignore').strip()
-                existing_pid = int(pid_text) if pid_text.isdigit() else None
-            except Exception:
-                existing_pid = None
-            self.logger.error(f"Another instance appears to be running (lock: {self.lockfile}, pid={existing_pid}).")
+            existing_pid = self._owner()
+            self.logger.error("Another instance appears to be running (lock: %s, pid=%s).", self.lockfile, existing_pid)
             return False
         except Exception as exc:
-            self.logger.error(f"Failed to acquire lock: {exc}")
+            self.logger.error("Failed to acquire lock: %s", exc)
             return False
 
     def release(self) -> None:
@@ -36,8 +87,15 @@ class InstanceLock:
                 self.lockfile.unlink(missing_ok=True)
                 self.logger.info("Released instance lock")
             except Exception as exc:
-                self.logger.warning(f"Failed to release lock: {exc}")
+                self.logger.warning("Failed to release lock: %s", exc)
             finally:
                 self._acquired = False
 
 
+class ShardLease(InstanceLock):
+    # One lease per shard of a sharded run, so K workers can share an output
+    # directory. Leases left behind by crashed workers are reclaimed.
+    def __init__(self, output_dir: Path, shard: int, shards: int, logger: logging.Logger):
+        super().__init__(output_dir / f".shard-{shard}-of-{shards}.lease", logger, reclaim_stale=True)
+        self.shard = shard
+        self.shards = shards
@@ -1,11 +1,65 @@
 import sys
+import time
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Tuple
+
+# Listeners own the real handlers; flushed and stopped at interpreter exit.
+_LISTENERS: List[QueueListener] = []
+_QUEUES: List[queue.Queue] = []
+_OWNED_HANDLERS: List[logging.Handler] = []
+
+
+class RateLimitFilter(logging.Filter):
+    # Lets the first 'burst' records per (logger, level, message template)
+    # through in each 'window' seconds and drops the rest. The next record
+    # that gets through reports how many were dropped. Only WARNING and
+    # ERROR are limited; keys use the unformatted template, so per-item
+    # messages must pass their values as arguments.
+    def __init__(self, burst: int = 5, window: float = 60.0):
+        super().__init__()
+        self.burst = max(0, int(burst))
+        self.window = max(0.0, float(window))
+        self._state: Dict[Tuple[str, int, str], List] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.burst or not logging.WARNING <= record.levelno < logging.CRITICAL:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state is not None else 0
+                self._state[key] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+            record.args = None
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock QueueHandler formats the message on the calling thread.
+    # Records only cross threads here, so they are queued as they are and
+    # all formatting happens on the listener thread.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 
 class LoggerFactory:
     @staticmethod
-    def create_logger(name: str, log_file: str, level: str = "INFO") -> logging.Logger:
+    def create_logger(name: str, log_file: str, level: str = "INFO",
+                      rate_limit: int = 5, rate_window: float = 60.0) -> logging.Logger:
         logger = logging.getLogger(name)
         if logger.handlers:
             return logger
@@ -15,11 +69,48 @@ class LoggerFactory:
         )
         file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3, encoding='utf-8')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        if not logging.getLogger().handlers:
+        handlers: List[logging.Handler] = [file_handler]
+        _OWNED_HANDLERS.append(file_handler)
+        root_handlers = logging.getLogger().handlers
+        if root_handlers:
+            # Records used to propagate to the root handlers; they now get
+            # them from the listener thread instead.
+            handlers.extend(root_handlers)
+        else:
             console = logging.StreamHandler(sys.stdout)
             console.setFormatter(formatter)
-            logger.addHandler(console)
+            handlers.append(console)
+            _OWNED_HANDLERS.append(console)
+
+        # File and console I/O (and rotation) run on the listener thread; the
+        # caller only enqueues the record.
+        records: queue.Queue = queue.Queue()
+        listener = QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        if not _LISTENERS:
+            atexit.register(LoggerFactory.shutdown)
+        _LISTENERS.append(listener)
+        _QUEUES.append(records)
+        queue_handler = _DeferredQueueHandler(records)
+        queue_handler.addFilter(RateLimitFilter(rate_limit, rate_window))
+        logger.addHandler(queue_handler)
+        logger.propagate = False
         return logger
 
+    @staticmethod
+    def flush() -> None:
+        # Blocks until every queued record has been handed to the handlers.
+        for records in _QUEUES:
+            records.join()
 
+    @staticmethod
+    def shutdown() -> None:
+        while _LISTENERS:
+            listener = _LISTENERS.pop()
+            try:
+                listener.stop()
+            except Exception:
+                pass
+        while _OWNED_HANDLERS:
+            _OWNED_HANDLERS.pop().close()
+        _QUEUES.clear()
@@ -0,0 +1,91 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class RunManifest:
+    FILENAME = '.tjm-manifest.json'
+    VERSION = 1
+
+    def __init__(self, output_dir: Path, logger: logging.Logger, algorithm: Optional[str] = None):
+        self.path = output_dir / self.FILENAME
+        self.logger = logger
+        self.algorithm = algorithm
+        self.entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._changed: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        self.entries = {}
+        self._dirty = False
+        self._changed = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            self.logger.warning("Ignoring unreadable manifest %s: %s", self.path.name, exc)
+            return
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            self.logger.warning("Ignoring manifest with unexpected format: %s", self.path.name)
+            return
+        if self.algorithm and data.get('algorithm', 'sha256') != self.algorithm:
+            # Hashes from another algorithm can never match; start afresh.
+            self.logger.info("Manifest %s uses %s, not %s; rewriting all posts",
+                             self.path.name, data.get('algorithm', 'sha256'), self.algorithm)
+            return
+        posts = data.get('posts')
+        if isinstance(posts, dict):
+            self.entries = {str(k): v for k, v in posts.items() if isinstance(v, dict)}
+
+    def lookup(self, post_id) -> Optional[Dict]:
+        return self.entries.get(str(post_id))
+
+    def is_unchanged(self, post_id, digest: str) -> bool:
+        entry = self.lookup(post_id)
+        return entry is not None and entry.get('hash') == digest
+
+    def record(self, post_id, filename: str, digest: str, size: int, base: Optional[str] = None) -> None:
+        # 'base' is the name before conflict resolution; a run naming posts
+        # differently does not match the entry.
+        with self._lock:
+            entry = {'filename': filename, 'hash': digest, 'size': size}
+            if base is not None:
+                entry['base'] = base
+            self.entries[str(post_id)] = entry
+            self._changed[str(post_id)] = entry
+            self._dirty = True
+
+    def changes(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self._changed)
+
+    def merge(self, changes: Dict[str, Dict]) -> None:
+        with self._lock:
+            if changes:
+                self.entries.update(changes)
+                self._changed.update(changes)
+                self._dirty = True
+
+    def save(self) -> bool:
+        with self._lock:
+            if not self._dirty:
+                return True
+            payload = {'version': self.VERSION, 'posts': self.entries}
+            if self.algorithm:
+                payload['algorithm'] = self.algorithm
+            tmp = self.path.with_name(self.path.name + '.tmp')
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, separators=(',', ':'), sort_keys=True)
+                os.replace(tmp, self.path)
+                self._dirty = False
+                return True
+            except OSError as exc:
+                self.logger.error("Failed to save manifest %s: %s", self.path, exc)
+                return False
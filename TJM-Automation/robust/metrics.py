@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+
+class RunReport(dict):
+    # Still a dict of the three run counters, so existing callers keep
+    # indexing stats['total_posts'] etc.; stage spans and extra counters
+    # ride along as attributes.
+    POST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        super().__init__(total_posts=0, successful_posts=0, failed_posts=0)
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.spans: Dict[str, List[float]] = {}
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.setdefault(stage, []).append(seconds)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> Dict:
+        # Plain, picklable copy of the raw data so reports from other
+        # processes can be merged without losing the span samples.
+        with self._lock:
+            return {
+                'stats': dict(self),
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'spans': {stage: list(values) for stage, values in self.spans.items()},
+            }
+
+    def merge(self, snapshot: Dict) -> None:
+        with self._lock:
+            for key, value in snapshot.get('stats', {}).items():
+                self[key] = self.get(key, 0) + value
+            for name, value in snapshot.get('counters', {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.gauges.update(snapshot.get('gauges', {}))
+            for stage, values in snapshot.get('spans', {}).items():
+                self.spans.setdefault(stage, []).extend(values)
+
+    def finish(self) -> 'RunReport':
+        self.finished_at = time.time()
+        return self
+
+    @staticmethod
+    def _quantile(ordered: List[float], pct: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            spans = {stage: sorted(values) for stage, values in self.spans.items()}
+        return {
+            stage: {
+                'count': len(values),
+                'sum': sum(values),
+                'p50': self._quantile(values, 50),
+                'p95': self._quantile(values, 95),
+                'p99': self._quantile(values, 99),
+                'max': values[-1] if values else 0.0,
+            }
+            for stage, values in spans.items()
+        }
+
+    def post_histogram(self) -> Dict[str, int]:
+        with self._lock:
+            values = list(self.spans.get('post', []))
+        histogram = {str(bound): sum(1 for v in values if v <= bound) for bound in self.POST_BUCKETS}
+        histogram['+Inf'] = len(values)
+        return histogram
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        finished = self.finished_at or time.time()
+        return {
+            'stats': dict(self),
+            'started_at': self.started_at,
+            'duration_seconds': finished - self.started_at,
+            'counters': counters,
+            'gauges': gauges,
+            'stages': self.stage_summary(),
+            'post_latency_histogram': self.post_histogram(),
+        }
+
+    def to_prometheus(self, prefix: str = 'tjm') -> str:
+        data = self.to_dict()
+        lines = []
+        for key, value in data['stats'].items():
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+        lines.append(f"# TYPE {prefix}_run_duration_seconds gauge")
+        lines.append(f"{prefix}_run_duration_seconds {data['duration_seconds']:.6f}")
+        lines.append(f"# TYPE {prefix}_run_last_finished_timestamp_seconds gauge")
+        lines.append(f"{prefix}_run_last_finished_timestamp_seconds {self.finished_at or time.time():.3f}")
+        for name, value in sorted(data['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in sorted(data['gauges'].items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        lines.append(f"# TYPE {prefix}_stage_seconds summary")
+        for stage, stats in sorted(data['stages'].items()):
+            for q in ('p50', 'p95', 'p99'):
+                quantile = int(q[1:]) / 100
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[q]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines.append(f"# TYPE {prefix}_post_seconds histogram")
+        post = data['stages'].get('post', {'sum': 0.0, 'count': 0})
+        for bound, count in data['post_latency_histogram'].items():
+            lines.append(f'{prefix}_post_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{prefix}_post_seconds_sum {post['sum']:.6f}")
+        lines.append(f"{prefix}_post_seconds_count {post['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: Path, fmt: str = 'json') -> None:
+        # Written to a temp file and renamed so collectors never read a
+        # partially written file.
+        text = self.to_prometheus() if fmt == 'prometheus' else json.dumps(self.to_dict(), indent=2)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
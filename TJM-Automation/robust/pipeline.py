@@ -0,0 +1,109 @@
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+_DONE = object()
+
+
+class Pipeline:
+    # Stages joined by bounded queues, each stage on its own thread(s). A
+    # full queue blocks whoever feeds it, so at most 'depth' items wait in
+    # front of any stage however long the source is. A stage function returns
+    # the item for the next stage, or None to drop it. Once 'abort' is set,
+    # the source is told to stop and stages drain their queues without doing
+    # any more work, so nothing is left blocked on a full queue.
+    POLL = 0.1
+
+    def __init__(self, logger: logging.Logger, depth: int = 64, abort: Optional[threading.Event] = None):
+        self.logger = logger
+        self.depth = max(1, int(depth))
+        self.abort = abort or threading.Event()
+        # Exceptions per stage; 'source' for the producer.
+        self.errors: Dict[str, int] = {}
+        # Times a stage (or the source) found the next queue full.
+        self.stalls: Dict[str, int] = {}
+        self._stages: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, func: Callable[[Any], Any], workers: int = 1) -> 'Pipeline':
+        self._stages.append({'name': name, 'func': func, 'workers': max(1, int(workers)),
+                             'queue': queue.Queue(self.depth), 'live': 0})
+        return self
+
+    def _put(self, index: int, item: Any, source: str) -> bool:
+        # Blocks while the queue is full, but gives up once aborted.
+        target = self._stages[index]['queue']
+        try:
+            target.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.stalls[source] = self.stalls.get(source, 0) + 1
+        while not self.abort.is_set():
+            try:
+                target.put(item, timeout=self.POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _error(self, name: str) -> None:
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def _finish(self, index: int) -> None:
+        stage = self._stages[index]
+        for _ in range(stage['workers']):
+            # Sentinels must always arrive, aborted or not; the stage drains.
+            stage['queue'].put(_DONE)
+
+    def _work(self, index: int) -> None:
+        stage = self._stages[index]
+        last = index == len(self._stages) - 1
+        while True:
+            item = stage['queue'].get()
+            if item is _DONE:
+                break
+            if self.abort.is_set():
+                continue
+            try:
+                result = stage['func'](item)
+            except Exception as exc:
+                self._error(stage['name'])
+                self.logger.error("Pipeline stage %s failed: %s", stage['name'], exc)
+                continue
+            if result is not None and not last:
+                self._put(index + 1, result, stage['name'])
+        with self._lock:
+            stage['live'] -= 1
+            closing = stage['live'] == 0
+        if closing and not last:
+            self._finish(index + 1)
+
+    def run(self, produce: Callable[[Callable[[Any], bool]], None]) -> None:
+        # produce(emit) runs on the calling thread; emit(item) returns False
+        # once the pipeline has been aborted.
+        if not self._stages:
+            return
+        threads = []
+        for index, stage in enumerate(self._stages):
+            stage['live'] = stage['workers']
+            for n in range(stage['workers']):
+                thread = threading.Thread(target=self._work, args=(index,), daemon=True,
+                                          name=f"tjm-{stage['name']}-{n}")
+                thread.start()
+                threads.append(thread)
+        try:
+            produce(lambda item: self._put(0, item, 'source'))
+        except Exception as exc:
+            # Whatever was produced before the failure still goes through.
+            self._error('source')
+            self.logger.error("Pipeline source failed: %s", exc)
+        except BaseException:
+            self.abort.set()
+            raise
+        finally:
+            self._finish(0)
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,119 @@
+import zlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .bot_impl import RobustNotepadBot
+from .lock import ShardLease
+from .metrics import RunReport
+
+
+def shard_of(post_id, shards: int) -> int:
+    try:
+        return int(post_id) % shards
+    except (TypeError, ValueError):
+        return zlib.crc32(str(post_id).encode('utf-8')) % shards
+
+
+def _shard_log_file(log_file: str, shard: int) -> str:
+    # RotatingFileHandler cannot rotate safely across processes, so every
+    # worker logs to its own file next to the main one.
+    path = Path(log_file)
+    return str(path.with_name(f"{path.stem}.shard{shard}{path.suffix}"))
+
+
+def _run_shard(bot_kwargs: Dict, shard: int, shards: int, numbered: List[Tuple[int, Dict]],
+               prefix: str, extension: str) -> Dict:
+    bot = RobustNotepadBot(**bot_kwargs)
+    try:
+        lease = ShardLease(bot.files.output_dir, shard, shards, bot.logger)
+        indices = [idx for idx, _ in numbered]
+        stats = bot.run_shard([post for _, post in numbered], prefix, extension, lease, indices)
+        changes = bot.manifest.changes() if bot.manifest is not None else {}
+        return {'report': stats.snapshot(), 'manifest': changes}
+    finally:
+        bot.close()
+
+
+class ShardCoordinator:
+    # Fetches once, splits the posts by id across worker processes and merges
+    # their reports and manifest updates. Workers write directly; Notepad
+    # cannot be driven from several processes at once. The coordinator holds
+    # the directory's .run.lock throughout, so no plain run and no sharded run
+    # with another shard count can write the same files meanwhile.
+    def __init__(self, bot_kwargs: Dict, shards: int):
+        self.shards = max(1, int(shards))
+        self.bot_kwargs = dict(bot_kwargs, gui_backend=None, use_gui=False)
+        self.bot = RobustNotepadBot(**dict(self.bot_kwargs))
+        self.logger = self.bot.logger
+
+    def _worker_kwargs(self, shard: int) -> Dict:
+        kwargs = dict(self.bot_kwargs, metrics_file=None)
+        kwargs['log_file'] = _shard_log_file(kwargs['log_file'], shard)
+        # Archive output: one archive per shard.
+        kwargs['archive_name'] = f"{kwargs.get('archive_name', 'posts')}.shard{shard}"
+        return kwargs
+
+    def partition(self, posts: List[Dict]) -> Dict[int, List[Tuple[int, Dict]]]:
+        # Posts keep their position in the fetch, which names id-less posts.
+        slices: Dict[int, List[Tuple[int, Dict]]] = {}
+        for idx, post in enumerate(posts, 1):
+            slices.setdefault(shard_of(post.get('id', idx), self.shards), []).append((idx, post))
+        return slices
+
+    def run(self, limit: int, prefix: str, extension: str,
+            post_ids: Optional[List[int]] = None) -> RunReport:
+        bot = self.bot
+        stats = bot.report = RunReport()
+        locked = False
+        try:
+            if not bot.files.ensure_output_dir():
+                self.logger.error('Output directory not writable')
+                return stats
+            locked = bot.lock.acquire()
+            if not locked:
+                return stats
+            with stats.span('fetch'):
+                posts = bot._fetch(limit, post_ids)
+            if not posts:
+                return stats
+            slices = self.partition(posts)
+            self.logger.info("Sharding %d posts across %d worker processes", len(posts), len(slices))
+            stats.set_gauge('shards', len(slices))
+            if bot.manifest is not None:
+                bot.manifest.load()
+            # spawn everywhere, as on Windows: workers build their own loggers
+            # and HTTP sessions instead of inheriting the coordinator's.
+            context = multiprocessing.get_context('spawn')
+            with stats.span('shards'), ProcessPoolExecutor(max_workers=len(slices), mp_context=context) as pool:
+                futures = {
+                    pool.submit(_run_shard, self._worker_kwargs(shard), shard, self.shards,
+                                numbered, prefix, extension): shard
+                    for shard, numbered in slices.items()
+                }
+                for future in as_completed(futures):
+                    shard = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as exc:
+                        self.logger.error("Shard %s worker failed: %s", shard, exc)
+                        stats['total_posts'] += len(slices[shard])
+                        stats['failed_posts'] += len(slices[shard])
+                        stats.incr('shard_failures')
+                        continue
+                    stats.merge(result['report'])
+                    if bot.manifest is not None:
+                        bot.manifest.merge(result['manifest'])
+            if bot.manifest is not None:
+                with stats.span('manifest'):
+                    bot.manifest.save()
+            return stats
+        finally:
+            if locked:
+                bot.lock.release()
+            stats.finish()
+            bot._export_metrics(stats)
+
+    def close(self) -> None:
+        self.bot.close()
@@ -0,0 +1,204 @@
+import io
+import os
+import json
+import struct
+import tarfile
+import time
+import zipfile
+import logging
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+
+class ArchiveSink:
+    # Streams every post of a run into one archive through a single open
+    # handle. The archive is built under a temp name and renamed into place
+    # on close. An index of name -> size/hash (plus offset for pack files)
+    # travels inside the archive.
+    EXTENSION = ''
+    INDEX_NAME = '.tjm-index.json'
+
+    def __init__(self, path: Path, logger: logging.Logger, hash_bytes: Callable[[bytes], str],
+                 hash_algorithm: str):
+        self.path = path
+        self.logger = logger
+        self.hash_bytes = hash_bytes
+        self.hash_algorithm = hash_algorithm
+        self.entries: Dict[str, Dict] = {}
+        # Flush the finished archive to disk before it is renamed into place.
+        self.durable = False
+        self._tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self._lock = threading.Lock()
+        self._open = False
+
+    def open(self) -> bool:
+        try:
+            self._open_handle(self._tmp)
+            self._open = True
+            self.entries = {}
+            return True
+        except OSError as exc:
+            self.logger.error("Cannot create archive %s: %s", self.path, exc)
+            return False
+
+    def add(self, name: str, data: bytes) -> bool:
+        digest = self.hash_bytes(data)
+        with self._lock:
+            if not self._open:
+                self.logger.error("Archive %s is not open; cannot add %s", self.path.name, name)
+                return False
+            try:
+                entry = self._write_member(name, data)
+            except (OSError, ValueError) as exc:
+                self.logger.error("Failed to add %s to %s: %s", name, self.path.name, exc)
+                return False
+            entry.update(size=len(data), hash=digest)
+            self.entries[name] = entry
+            return True
+
+    def index(self) -> Dict:
+        return {'algorithm': self.hash_algorithm, 'files': self.entries}
+
+    def close(self) -> bool:
+        with self._lock:
+            if not self._open:
+                return True
+            self._open = False
+            try:
+                self._finish(json.dumps(self.index(), sort_keys=True).encode('utf-8'))
+                if self.durable:
+                    fd = os.open(self._tmp, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                os.replace(self._tmp, self.path)
+                self.logger.info("Wrote %d posts to %s", len(self.entries), self.path)
+                return True
+            except OSError as exc:
+                self.logger.error("Failed to finish archive %s: %s", self.path, exc)
+                try:
+                    self._tmp.unlink(missing_ok=True)
+                except OSError:
+                    pass
+                return False
+
+    def _open_handle(self, path: Path) -> None:
+        raise NotImplementedError
+
+    def _write_member(self, name: str, data: bytes) -> Dict:
+        raise NotImplementedError
+
+    def _finish(self, index: bytes) -> None:
+        raise NotImplementedError
+
+
+class ZipSink(ArchiveSink):
+    EXTENSION = 'zip'
+
+    def _open_handle(self, path: Path) -> None:
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def _write_member(self, name: str, data: bytes) -> Dict:
+        self._zip.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data,
+                           compress_type=zipfile.ZIP_DEFLATED)
+        return {}
+
+    def _finish(self, index: bytes) -> None:
+        try:
+            self._zip.writestr(self.INDEX_NAME, index)
+        finally:
+            self._zip.close()
+
+
+class TarSink(ArchiveSink):
+    EXTENSION = 'tar'
+
+    def _open_handle(self, path: Path) -> None:
+        self._tar = tarfile.open(path, 'w', format=tarfile.PAX_FORMAT)
+
+    def _add(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def _write_member(self, name: str, data: bytes) -> Dict:
+        self._add(name, data)
+        return {}
+
+    def _finish(self, index: bytes) -> None:
+        try:
+            self._add(self.INDEX_NAME, index)
+        finally:
+            self._tar.close()
+
+
+class PackSink(ArchiveSink):
+    # Length-prefixed records with a JSON offset index at the end:
+    #   MAGIC
+    #   per post: u32 name length, name (utf-8), u64 data length, data
+    #   index JSON, then TRAILER = u64 index offset, u64 index length, END
+    # Records can be read back with one seek each through PackReader.
+    EXTENSION = 'pack'
+    MAGIC = b'TJMPACK1'
+    END = b'TJMINDEX'
+    RECORD = struct.Struct('<I')
+    LENGTH = struct.Struct('<Q')
+    TRAILER = struct.Struct('<QQ8s')
+
+    def _open_handle(self, path: Path) -> None:
+        self._fh: BinaryIO = open(path, 'wb')
+        self._fh.write(self.MAGIC)
+        self._offset = len(self.MAGIC)
+
+    def _write_member(self, name: str, data: bytes) -> Dict:
+        encoded = name.encode('utf-8')
+        header = self.RECORD.pack(len(encoded)) + encoded + self.LENGTH.pack(len(data))
+        self._fh.write(header)
+        self._fh.write(data)
+        offset = self._offset + len(header)
+        self._offset = offset + len(data)
+        return {'offset': offset}
+
+    def _finish(self, index: bytes) -> None:
+        try:
+            self._fh.write(index)
+            self._fh.write(self.TRAILER.pack(self._offset, len(index), self.END))
+        finally:
+            self._fh.close()
+
+
+class PackReader:
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(PackSink.MAGIC)) != PackSink.MAGIC:
+                raise ValueError(f"{path} is not a pack file")
+            f.seek(-PackSink.TRAILER.size, os.SEEK_END)
+            offset, length, end = PackSink.TRAILER.unpack(f.read(PackSink.TRAILER.size))
+            if end != PackSink.END:
+                raise ValueError(f"{path} has no index (incomplete pack file?)")
+            f.seek(offset)
+            index = json.loads(f.read(length).decode('utf-8'))
+        self.algorithm: str = index.get('algorithm', 'sha256')
+        self.entries: Dict[str, Dict] = index.get('files', {})
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def read(self, name: str) -> Optional[bytes]:
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['size'])
+
+
+SINKS = {
+    'zip': ZipSink,
+    'tar': TarSink,
+    'pack': PackSink,
+}
@@ -0,0 +1,77 @@
+import os
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class PostTemplate:
+    # Compiled once into a positional format string plus the list of fields
+    # and filters that feed it. Rendering formats the post and encodes the
+    # result once, with the platform's line endings, so the bytes handed to
+    # the size check, the writer and the hasher are produced in one pass.
+    #
+    # Fields are post keys in braces, optionally piped through a filter:
+    # {id}, {title|upper}, {body|strip}. Literal braces are doubled.
+    DEFAULT = (
+        "BLOG POST #{id}\n\n"
+        "{title|upper}\n\n"
+        "{body}\n\n"
+        "---\nGenerated by TJM Automation Bot\n"
+        "Post ID: {id}\n"
+        "User ID: {userId}\n"
+    )
+    DEFAULTS = {'title': 'Untitled Post', 'body': 'No content available.'}
+    MISSING = 'Unknown'
+    FILTERS: Dict[str, Callable[[str], str]] = {
+        'upper': str.upper,
+        'lower': str.lower,
+        'strip': str.strip,
+        'title': str.title,
+    }
+
+    def __init__(self, source: Optional[str] = None, newline: str = os.linesep):
+        self.source = self.DEFAULT if source is None else source
+        self.newline = newline
+        self._format, self._fields = self._compile()
+
+    def _compile(self) -> Tuple[Callable[..., str], List[Tuple[str, Tuple[Callable[[str], str], ...]]]]:
+        pieces: List[str] = []
+        fields: List[Tuple[str, Tuple[Callable[[str], str], ...]]] = []
+        try:
+            parsed = list(Formatter().parse(self.source))
+        except ValueError as exc:
+            raise ValueError(f"Invalid output template: {exc}") from None
+        for literal, field, spec, conversion in parsed:
+            pieces.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Format specs are not supported in output templates: {{{field}}}")
+            name, *names = [piece.strip() for piece in field.split('|')]
+            if not name:
+                raise ValueError('Empty field in output template')
+            unknown = [f for f in names if f not in self.FILTERS]
+            if unknown:
+                raise ValueError(f"Unknown template filter(s): {', '.join(unknown)}")
+            pieces.append(f"{{{len(fields)}}}")
+            fields.append((name, tuple(self.FILTERS[f] for f in names)))
+        return ''.join(pieces).format, fields
+
+    def _values(self, post: Dict) -> List[str]:
+        values = []
+        for field, filters in self._fields:
+            value = post.get(field)
+            value = str(value) if value is not None else self.DEFAULTS.get(field, self.MISSING)
+            for apply in filters:
+                value = apply(value)
+            values.append(value)
+        return values
+
+    def render(self, post: Dict) -> bytes:
+        text = self._format(*self._values(post))
+        if self.newline != '\n':
+            text = text.replace('\n', self.newline)
+        return text.encode('utf-8', errors='replace')
+
+    def render_text(self, post: Dict) -> str:
+        # '\n' line endings, for typing into the editor.
+        return self._format(*self._values(post))
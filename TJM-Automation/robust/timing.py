@@ -0,0 +1,75 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from .waiter import Waiter
+
+
+class AdaptiveTimer:
+    # Learns how quickly this machine's UI reacts. Condition waits record how
+    # long each observable event took; blind settle delays then shrink from
+    # their defaults towards the observed p95 times a safety margin.
+    def __init__(self, logger: logging.Logger, margin: float = 1.5, floor: float = 0.02,
+                 min_samples: int = 5, window: int = 200):
+        self.logger = logger
+        self.margin = max(1.0, float(margin))
+        self.floor = max(0.0, float(floor))
+        self.min_samples = max(1, int(min_samples))
+        self._window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, name: str) -> Deque[float]:
+        series = self._samples.get(name)
+        if series is None:
+            series = self._samples[name] = deque(maxlen=self._window)
+        return series
+
+    def record(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            self._series(name).append(elapsed)
+            self._series('*').append(elapsed)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        with self._lock:
+            series = self._samples.get(name)
+            if not series or len(series) < self.min_samples:
+                return None
+            ordered = sorted(series)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def delay(self, name: str, default: float) -> float:
+        observed = self.percentile(name, 95)
+        if observed is None:
+            observed = self.percentile('*', 95)
+        if observed is None:
+            return default
+        return min(default, max(self.floor, observed * self.margin))
+
+    def settle(self, name: str, default: float) -> None:
+        pause = self.delay(name, default)
+        if pause > 0:
+            time.sleep(pause)
+
+    def wait_for(self, name: str, predicate: Callable[[], bool], timeout: float) -> bool:
+        # Poll fast at first, then back off; the starting interval tracks the
+        # typical latency of this event so quick events are caught promptly.
+        typical = self.percentile(name, 50)
+        poll = min(0.05, max(0.005, typical / 4)) if typical is not None else 0.01
+        elapsed = Waiter.wait_adaptive(predicate, timeout, poll=poll, max_poll=0.1)
+        if elapsed is None:
+            return False
+        self.record(name, elapsed)
+        return True
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        report: Dict[str, Dict[str, float]] = {}
+        for name in list(self._samples):
+            p50 = self.percentile(name, 50)
+            if p50 is None:
+                continue
+            report[name] = {'p50': p50, 'p95': self.percentile(name, 95), 'p99': self.percentile(name, 99)}
+        return report
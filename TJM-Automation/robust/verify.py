@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import mmap
+import time
+import hashlib
+import tarfile
+import zipfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .manifest import RunManifest
+from .sinks import ArchiveSink, PackReader, SINKS
+
+# Files at least this large are hashed through mmap instead of read().
+MMAP_THRESHOLD = 1024 * 1024
+# Files per pool task; keeps IPC overhead small for many tiny files.
+CHUNK_SIZE = 256
+
+Result = Tuple[str, Optional[int], Optional[str], Optional[str]]
+
+
+def _hash_file(path: Path, algorithm: str, expected_size: Optional[int]) -> Result:
+    # (name, size, digest, error); the digest is skipped when the size
+    # already disagrees.
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if expected_size is not None and size != expected_size:
+                return path.name, size, None, None
+            digest = hashlib.new(algorithm)
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    digest.update(view)
+            else:
+                digest.update(f.read())
+        return path.name, size, digest.hexdigest(), None
+    except FileNotFoundError:
+        return path.name, None, None, 'missing'
+    except OSError as exc:
+        return path.name, None, None, str(exc)
+
+
+def _hash_files(directory: str, jobs: List[Tuple[str, Optional[int]]], algorithm: str) -> List[Result]:
+    return [_hash_file(Path(directory) / name, algorithm, size) for name, size in jobs]
+
+
+def _hash_spans(archive: str, spans: List[Tuple[str, int, int]], algorithm: str) -> List[Result]:
+    # Uncompressed members (pack records, tar members) located by the
+    # parent: one mapping per task, hashed in place and in file order.
+    results: List[Result] = []
+    with open(archive, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        data = memoryview(view)
+        try:
+            for name, offset, size in spans:
+                record = data[offset:offset + size]
+                results.append((name, len(record), hashlib.new(algorithm, record).hexdigest(), None))
+                record.release()
+        finally:
+            data.release()
+    return results
+
+
+_zip: Optional[zipfile.ZipFile] = None
+
+
+def _open_zip(archive: str) -> None:
+    # Pool initializer: each worker reads the central directory once.
+    global _zip
+    _zip = zipfile.ZipFile(archive)
+
+
+def _hash_zip_members(names: List[str], algorithm: str) -> List[Result]:
+    results: List[Result] = []
+    for name in names:
+        data = _zip.read(name)
+        results.append((name, len(data), hashlib.new(algorithm, data).hexdigest(), None))
+    return results
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BulkVerifier:
+    # Checks a whole output directory against its manifest, or an archive
+    # against its embedded index, hashing in parallel across processes.
+    def __init__(self, target: Path, workers: Optional[int] = None, algorithm: Optional[str] = None):
+        self.target = target
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.algorithm = algorithm
+
+    def _archive_kind(self) -> Optional[str]:
+        if self.target.is_file():
+            suffix = self.target.suffix.lstrip('.').lower()
+            return next((kind for kind, sink in SINKS.items() if sink.EXTENSION == suffix), None)
+        return None
+
+    def _expected_from_manifest(self) -> Tuple[str, Dict[str, Dict]]:
+        path = self.target / RunManifest.FILENAME
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        posts = data.get('posts') if isinstance(data, dict) else None
+        if not isinstance(posts, dict):
+            raise ValueError(f"{path} has no posts")
+        expected = {entry['filename']: entry for entry in posts.values()
+                    if isinstance(entry, dict) and entry.get('filename')}
+        return data.get('algorithm') or 'sha256', expected
+
+    def _expected_from_archive(self, kind: str) -> Tuple[str, Dict[str, Dict], Dict[str, Tuple[int, int]]]:
+        # (algorithm, index entries, {member: (offset, size)}), read once here
+        # so that workers never parse the archive structure per task.
+        if kind == 'pack':
+            reader = PackReader(self.target)
+            spans = {name: (entry['offset'], entry['size']) for name, entry in reader.entries.items()}
+            return reader.algorithm, reader.entries, spans
+        if kind == 'zip':
+            with zipfile.ZipFile(self.target) as zf:
+                index = json.loads(zf.read(ArchiveSink.INDEX_NAME))
+                spans = {info.filename: (info.header_offset, info.file_size) for info in zf.infolist()}
+        else:
+            # The tar sink writes uncompressed archives, so member data can be
+            # read in place at its offset.
+            with tarfile.open(self.target, 'r:') as tf:
+                member = tf.extractfile(ArchiveSink.INDEX_NAME)
+                if member is None:
+                    raise ValueError(f"{self.target} has no {ArchiveSink.INDEX_NAME}")
+                index = json.loads(member.read())
+                spans = {m.name: (m.offset_data, m.size) for m in tf.getmembers() if m.isfile()}
+        spans.pop(ArchiveSink.INDEX_NAME, None)
+        return index.get('algorithm', 'sha256'), index.get('files', {}), spans
+
+    def _extra_files(self, expected: Dict[str, Dict]) -> List[str]:
+        # Dot files are the bot's own bookkeeping (manifest, locks, cache).
+        with os.scandir(self.target) as entries:
+            return sorted(entry.name for entry in entries
+                          if entry.is_file() and not entry.name.startswith('.') and entry.name not in expected)
+
+    def run(self) -> Dict:
+        start = time.perf_counter()
+        kind = self._archive_kind()
+        spans: Dict[str, Tuple[int, int]] = {}
+        if kind is not None:
+            algorithm, expected, spans = self._expected_from_archive(kind)
+            extra = sorted(set(spans) - set(expected))
+        else:
+            algorithm, expected = self._expected_from_manifest()
+            extra = self._extra_files(expected)
+        algorithm = self.algorithm or algorithm
+        hashlib.new(algorithm)
+
+        names = sorted(expected)
+        summary = {
+            'target': str(self.target),
+            'kind': kind or 'directory',
+            'algorithm': algorithm,
+            'expected': len(names),
+            'ok': 0,
+            'mismatched': [],
+            'missing': [],
+            'extra': extra,
+            'errors': [],
+        }
+        if kind is not None:
+            summary['missing'] = [name for name in names if name not in spans]
+            names = sorted((name for name in names if name in spans), key=lambda name: spans[name][0])
+        pool_args = {'initializer': _open_zip, 'initargs': (str(self.target),)} if kind == 'zip' else {}
+        with ProcessPoolExecutor(max_workers=self.workers, **pool_args) as pool:
+            if kind == 'zip':
+                futures = [pool.submit(_hash_zip_members, chunk, algorithm)
+                           for chunk in _chunks(names, CHUNK_SIZE)]
+            elif kind is not None:
+                futures = [pool.submit(_hash_spans, str(self.target),
+                                       [(name,) + spans[name] for name in chunk], algorithm)
+                           for chunk in _chunks(names, CHUNK_SIZE)]
+            else:
+                futures = [pool.submit(_hash_files, str(self.target),
+                                       [(name, expected[name].get('size')) for name in chunk], algorithm)
+                           for chunk in _chunks(names, CHUNK_SIZE)]
+            for future in futures:
+                for name, size, digest, error in future.result():
+                    entry = expected[name]
+                    if error == 'missing':
+                        summary['missing'].append(name)
+                    elif error is not None:
+                        summary['errors'].append({'name': name, 'error': error})
+                    elif entry.get('size') is not None and size != entry['size']:
+                        summary['mismatched'].append({'name': name, 'expected_size': entry['size'],
+                                                      'actual_size': size})
+                    elif digest != entry.get('hash'):
+                        summary['mismatched'].append({'name': name, 'expected': entry.get('hash'),
+                                                      'actual': digest})
+                    else:
+                        summary['ok'] += 1
+        summary['seconds'] = time.perf_counter() - start
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m robust.verify',
+        description='Check every saved post in an output directory (against .tjm-manifest.json) '
+                    'or in a zip/tar/pack archive (against its index) in parallel.')
+    parser.add_argument('target', type=Path, help='output directory or archive file')
+    parser.add_argument('--workers', type=int, default=None, help='hashing processes (default: CPU count)')
+    parser.add_argument('--algorithm', default=None, help='override the hash algorithm from the manifest/index')
+    parser.add_argument('--output', type=Path, help='also write the JSON summary to this file')
+    args = parser.parse_args(argv)
+
+    try:
+        summary = BulkVerifier(args.target, args.workers, args.algorithm).run()
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile, tarfile.TarError) as exc:
+        print(json.dumps({'target': str(args.target), 'error': str(exc)}))
+        return 2
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text, encoding='utf-8')
+    clean = not (summary['mismatched'] or summary['missing'] or summary['extra'] or summary['errors'])
+    return 0 if clean else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import time
-from typing import Callable
+from typing import Callable, Optional
 
 
 class Waiter:
@@ -15,4 +15,18 @@ class Waiter:
             time.sleep(poll)
         return False
 
-
+    @staticmethod
+    def wait_adaptive(predicate: Callable[[], bool], timeout: float, poll: float = 0.01,
+                      max_poll: float = 0.1, backoff: float = 1.5) -> Optional[float]:
+        start = time.monotonic()
+        while True:
+            try:
+                if predicate():
+                    return time.monotonic() - start
+            except Exception:
+                pass
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                return None
+            time.sleep(min(poll, remaining))
+            poll = min(max_poll, poll * backoff)
@@ -33,9 +33,13 @@ a = Analysis(
         # ('path/to/data', 'data'),
     ],
     hiddenimports=[
+        # Imported lazily (by name in bot.py, inside functions in
+        # robust/gui_backends.py), so list them explicitly.
         'pyautogui',
         'pygetwindow',
+        'pyperclip',
         'requests',
+        'robust.async_api',
         'pathlib',
         'logging',
         'subprocess',